@@ -0,0 +1,67 @@
+import numpy as np
+
+# Janelas das médias móveis, em meses
+JANELAS = (3, 12)
+
+# Z-score a partir do qual um mês é marcado como anômalo, e quantos meses de
+# histórico a categoria precisa ter antes de poder ser marcada. Só gasto acima
+# do padrão é marcado: o mês corrente, ainda incompleto, seria sempre um
+# desvio para baixo.
+ANOMALIA_LIMIAR = 2.0
+ANOMALIA_HISTORICO_MINIMO = 3
+
+
+def matriz_mensal(meses, categorias, totais, n_meses):
+    # Colunas (índice do mês na janela, nome da categoria, total em centavos)
+    # -> matriz categorias x meses; meses sem lançamento ficam com zero
+    nomes, linhas = np.unique(np.asarray(categorias, dtype=object).astype(str), return_inverse=True)
+    matriz = np.zeros((len(nomes), n_meses), dtype=np.int64)
+    np.add.at(matriz, (linhas, np.asarray(meses, dtype=np.int64)), np.asarray(totais, dtype=np.int64))
+    return nomes.tolist(), matriz
+
+
+def media_movel(matriz, janela):
+    # Média dos últimos `janela` meses (inclusive o próprio) por soma
+    # acumulada; no começo da série divide pelos meses disponíveis
+    acumulado = np.cumsum(matriz, axis=1, dtype=np.float64)
+    anterior = np.zeros_like(acumulado)
+    anterior[:, janela:] = acumulado[:, :-janela]
+    disponiveis = np.minimum(np.arange(1, matriz.shape[1] + 1), janela)
+    return (acumulado - anterior) / disponiveis
+
+
+def zscores(matriz, janela=12):
+    # Z-score de cada mês contra os `janela` meses anteriores (o próprio mês
+    # fica de fora para não diluir o desvio que se quer detectar). NaN onde o
+    # histórico é curto demais ou constante.
+    valores = matriz.astype(np.float64)
+    n = valores.shape[1]
+    soma = np.zeros((valores.shape[0], n + 1))
+    quadrados = np.zeros_like(soma)
+    np.cumsum(valores, axis=1, out=soma[:, 1:])
+    np.cumsum(valores ** 2, axis=1, out=quadrados[:, 1:])
+    fim = np.arange(n)
+    inicio = np.maximum(fim - janela, 0)
+    contagem = fim - inicio
+    with np.errstate(divide='ignore', invalid='ignore'):
+        media = (soma[:, fim] - soma[:, inicio]) / contagem
+        variancia = (quadrados[:, fim] - quadrados[:, inicio]) / contagem - media ** 2
+        desvio = np.sqrt(np.maximum(variancia, 0))
+        z = (valores - media) / desvio
+    z[:, contagem < ANOMALIA_HISTORICO_MINIMO] = np.nan
+    z[~np.isfinite(z)] = np.nan
+    return z
+
+
+def analisar(matriz, orcamentos):
+    # orcamentos: centavos por categoria (NaN sem orçamento), alinhado às
+    # linhas da matriz. Devolve arrays categorias x meses.
+    z = zscores(matriz, JANELAS[-1])
+    orcamentos = np.asarray(orcamentos, dtype=np.float64)[:, None]
+    return {
+        'total': matriz,
+        'medias': {janela: media_movel(matriz, janela) for janela in JANELAS},
+        'zscore': z,
+        'anomalia': np.nan_to_num(z) >= ANOMALIA_LIMIAR,
+        'diferenca': orcamentos - matriz,
+    }
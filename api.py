@@ -0,0 +1,206 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+from flask import Blueprint, request, jsonify, Response, make_response
+from extensions import db
+from models import MODELOS, DETALHES
+from ledger import (RELATORIO_ANUAL_MAX_ANOS, OPERACOES_LOTE_MAXIMO, versao_atual, totais_dashboard,
+                    consultar_extrato, criar_movimentacao, excluir_registro, restaurar_registro, aplicar_operacoes,
+                    consultar_relatorio_mensal, consultar_relatorio_anual, consultar_busca, consultar_projecao_cartao)
+from views import filtros_extrato, filtros_busca, meses_projecao
+import importacao
+
+# API JSON v1
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+def serializar_movimentacao(mov):
+    return {
+        'tipo': mov.tipo,
+        'id': mov.id,
+        'data': mov.data.isoformat(),
+        'valor': mov.valor,
+        'descricao': mov.descricao,
+        'detalhe': mov.detalhe
+    }
+
+def com_etag(view=None, variante=None):
+    # ETag forte = versão dos dados + URL. A versão é lida antes da consulta,
+    # então um ETag nunca é mais novo que o corpo e o 304 é seguro; com
+    # If-None-Match válido a view nem chega a rodar. `variante` entra no ETag
+    # quando o corpo depende de algo além dos dados (a data de hoje, por exemplo).
+    if view is None:
+        return lambda view: com_etag(view, variante)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        url = hashlib.sha1(request.full_path.encode()).hexdigest()[:16]
+        etag = f'{versao_atual()}-{url}'
+        if variante is not None:
+            etag = f'{etag}-{variante()}'
+        # Comparação fraca: com compressão o ETag sai como W/"..."
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
+
+def mes_corrente():
+    return datetime.now().strftime('%Y-%m')
+
+def erro_api(mensagem, status):
+    return jsonify({'success': False, 'message': mensagem}), status
+
+@bp.route('/totais')
+@com_etag
+def api_totais():
+    return jsonify(totais_dashboard())
+
+@bp.route('/movimentacoes')
+@com_etag
+def api_movimentacoes():
+    try:
+        movimentacoes, proximo_cursor = consultar_extrato(**filtros_extrato())
+    except ValueError as e:
+        return erro_api(str(e), 400)
+    return jsonify({
+        'movimentacoes': [serializar_movimentacao(m) for m in movimentacoes],
+        'proximo_cursor': proximo_cursor
+    })
+
+@bp.route('/busca')
+@com_etag
+def api_busca():
+    try:
+        filtros = filtros_busca()
+    except ValueError as e:
+        return erro_api(str(e), 400)
+    if not filtros['consulta'].strip():
+        return erro_api('Informe o termo de busca em q', 400)
+    movimentacoes, tem_proxima = consultar_busca(**filtros)
+    return jsonify({
+        'movimentacoes': [serializar_movimentacao(m) for m in movimentacoes],
+        'pagina': filtros['pagina'],
+        'proxima_pagina': filtros['pagina'] + 1 if tem_proxima else None
+    })
+
+@bp.route('/movimentacoes', methods=['POST'])
+def api_criar_movimentacao():
+    dados = request.get_json(silent=True) or {}
+    try:
+        tipo = dados['tipo']
+        if tipo not in MODELOS:
+            raise ValueError(f'Tipo inválido: {tipo}')
+        detalhe = dados.get('detalhe') or dados[DETALHES[tipo].key]
+        movimentacao = criar_movimentacao(
+            tipo,
+            importacao.parse_valor(str(dados['valor'])),
+            datetime.strptime(dados['data'], '%Y-%m-%d').date(),
+            dados.get('descricao', ''),
+            detalhe
+        )
+        db.session.commit()
+    except KeyError as e:
+        db.session.rollback()
+        return erro_api(f'Campo obrigatório faltando: {str(e)}', 400)
+    except ValueError as e:
+        db.session.rollback()
+        return erro_api(str(e), 400)
+    except Exception as e:
+        db.session.rollback()
+        return erro_api(str(e), 500)
+    return jsonify({
+        'success': True,
+        'movimentacao': {
+            'tipo': tipo,
+            'id': movimentacao.id,
+            'data': movimentacao.data.isoformat(),
+            'valor': movimentacao.valor,
+            'descricao': movimentacao.descricao,
+            'detalhe': detalhe
+        }
+    }), 201
+
+@bp.route('/movimentacoes/<tipo>/<int:id>', methods=['DELETE'])
+def api_excluir_movimentacao(tipo, id):
+    if tipo not in MODELOS:
+        return erro_api('Tipo inválido', 400)
+    try:
+        registro = excluir_registro(tipo, id)
+        if not registro:
+            return erro_api('Registro não encontrado', 404)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return erro_api(str(e), 500)
+    return jsonify({'success': True, 'message': 'Registro excluído com sucesso'})
+
+@bp.route('/movimentacoes/<tipo>/<int:id>/restaurar', methods=['POST'])
+def api_restaurar_movimentacao(tipo, id):
+    if tipo not in MODELOS:
+        return erro_api('Tipo inválido', 400)
+    try:
+        registro = restaurar_registro(tipo, id)
+        if not registro:
+            return erro_api('Registro não encontrado', 404)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return erro_api(str(e), 409)
+    except Exception as e:
+        db.session.rollback()
+        return erro_api(str(e), 500)
+    return jsonify({'success': True, 'message': 'Registro restaurado com sucesso'})
+
+@bp.route('/movimentacoes/lote', methods=['POST'])
+def api_operacoes_lote():
+    # {"operacoes": [{"tipo", "id", "operacao", ...}]}: tudo numa transação,
+    # com um resultado por item; itens recusados não impedem os demais
+    operacoes = (request.get_json(silent=True) or {}).get('operacoes')
+    if not isinstance(operacoes, list) or not all(isinstance(item, dict) for item in operacoes):
+        return erro_api('Informe a lista de operações em "operacoes"', 400)
+    if len(operacoes) > OPERACOES_LOTE_MAXIMO:
+        return erro_api(f'No máximo {OPERACOES_LOTE_MAXIMO} operações por lote', 400)
+    try:
+        resultados = aplicar_operacoes(operacoes)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return erro_api(str(e), 500)
+    aplicadas = sum(1 for resultado in resultados if resultado['status'] == 'ok')
+    return jsonify({
+        'success': aplicadas == len(resultados),
+        'message': f'{aplicadas} de {len(resultados)} operações aplicadas',
+        'resultados': resultados
+    })
+
+@bp.route('/relatorios/mensal')
+@com_etag
+def api_relatorio_mensal():
+    ano = request.args.get('ano', type=int)
+    mes = request.args.get('mes', type=int)
+    if not ano or not mes or not 1 <= mes <= 12:
+        return erro_api('Informe ano e mes (1-12)', 400)
+    return jsonify({'ano': ano, 'mes': mes, 'totais': consultar_relatorio_mensal(ano, mes)})
+
+@bp.route('/relatorios/anual')
+@com_etag
+def api_relatorio_anual():
+    try:
+        anos = sorted({int(ano) for ano in request.args.getlist('ano')})
+    except ValueError:
+        return erro_api('Ano inválido', 400)
+    if not anos or len(anos) > RELATORIO_ANUAL_MAX_ANOS:
+        return erro_api(f'Informe de 1 a {RELATORIO_ANUAL_MAX_ANOS} anos', 400)
+    return jsonify({'anos': consultar_relatorio_anual(anos)})
+
+# A projeção começa no mês corrente: na virada do mês o ETag muda mesmo sem
+# lançamento novo
+@bp.route('/relatorios/cartao')
+@com_etag(variante=mes_corrente)
+def api_relatorio_cartao():
+    return jsonify({'meses': consultar_projecao_cartao(meses_projecao(request.args))})
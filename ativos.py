@@ -0,0 +1,115 @@
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+from flask import current_app, request, url_for, send_from_directory, Response
+from compressao import codificacao_aceita, comprimir, compressivel
+
+# static/vendor: Bootstrap 5.1.3 (CSS, JS e o Popper 2.10.2 que ele usa) e
+# Bootstrap Icons 1.11.3, copiados dos pacotes oficiais sem os source maps
+
+# url("fonts/x.woff2?versao") no CSS do bootstrap-icons
+URL_FONTE = re.compile(r'url\("?(?:\./)?(fonts/[^"?)]+)(\?[^")]*)?"?\)')
+
+
+def nome_com_hash(caminho, conteudo):
+    # vendor/bootstrap.min.css -> vendor/bootstrap.min.<hash>.css
+    raiz, extensao = os.path.splitext(caminho)
+    return f'{raiz}.{hashlib.sha256(conteudo).hexdigest()[:12]}{extensao}'
+
+
+def referenciar_fontes(css, manifesto, diretorio):
+    # Aponta as fontes do CSS para os nomes com hash: assim elas também
+    # podem ser servidas como imutáveis
+    def trocar(encontrado):
+        fonte = posixpath.join(diretorio, encontrado.group(1))
+        if fonte not in manifesto:
+            return encontrado.group(0)
+        return f'url("{posixpath.relpath(manifesto[fonte], diretorio or ".")}")'
+    return URL_FONTE.sub(trocar, css)
+
+
+def ler(pasta, caminho, manifesto):
+    # Conteúdo servido: o CSS sai com as fontes já trocadas pelos nomes com hash
+    with open(os.path.join(pasta, caminho), 'rb') as f:
+        conteudo = f.read()
+    if caminho.endswith('.css'):
+        css = referenciar_fontes(conteudo.decode('utf-8'), manifesto, posixpath.dirname(caminho))
+        conteudo = css.encode('utf-8')
+    return conteudo
+
+
+def mapear(pasta):
+    # {caminho lógico: nome com hash} de todos os arquivos da pasta estática.
+    # O CSS entra por último e o hash é do conteúdo servido: uma fonte nova
+    # muda também a URL do CSS que a referencia
+    manifesto = {}
+    if not pasta or not os.path.isdir(pasta):
+        return manifesto
+    caminhos = []
+    for raiz, _, arquivos in os.walk(pasta):
+        for arquivo in arquivos:
+            if not arquivo.startswith('.'):
+                caminhos.append(os.path.relpath(os.path.join(raiz, arquivo), pasta).replace(os.sep, '/'))
+    for caminho in sorted(caminhos, key=lambda caminho: caminho.endswith('.css')):
+        manifesto[caminho] = nome_com_hash(caminho, ler(pasta, caminho, manifesto))
+    return manifesto
+
+
+class Ativos:
+    # Arquivos de static/ servidos em /ativos/ com o hash do conteúdo no nome
+    # e Cache-Control imutável: um deploy que muda o arquivo muda a URL. O
+    # manifesto é montado uma vez por worker; as versões comprimidas ficam
+    # em memória depois do primeiro pedido.
+
+    def init_app(self, app):
+        app.config.setdefault('ATIVOS_MAX_AGE', 365 * 24 * 3600)
+        manifesto = mapear(app.static_folder)
+        app.extensions['ativos'] = {
+            'manifesto': manifesto,
+            'arquivos': {nome: caminho for caminho, nome in manifesto.items()},
+            'comprimidos': {},
+            'lock': threading.Lock()
+        }
+        app.add_url_rule('/ativos/<path:nome>', 'ativos', self._servir)
+        app.add_template_global(self.url, 'ativo')
+
+    def url(self, caminho):
+        nome = current_app.extensions['ativos']['manifesto'].get(caminho)
+        if nome is not None:
+            return url_for('ativos', nome=nome)
+        return url_for('static', filename=caminho)
+
+    def _conteudo(self, estado, caminho, codificacao):
+        chave = (caminho, codificacao)
+        conteudo = estado['comprimidos'].get(chave)
+        if conteudo is None:
+            conteudo = ler(current_app.static_folder, caminho, estado['manifesto'])
+            if codificacao:
+                # Comprimido uma vez por worker: nível máximo
+                conteudo = comprimir(conteudo, codificacao, {'gzip': 9, 'br': 11})
+            with estado['lock']:
+                estado['comprimidos'][chave] = conteudo
+        return conteudo
+
+    def _servir(self, nome):
+        estado = current_app.extensions['ativos']
+        caminho = estado['arquivos'].get(nome)
+        if caminho is None:
+            # Nome sem hash: servido normalmente, sem cache de longo prazo
+            return send_from_directory(current_app.static_folder, nome)
+        mimetype = mimetypes.guess_type(caminho)[0] or 'application/octet-stream'
+        codificacao = None
+        if (compressivel(mimetype)
+                and os.path.getsize(os.path.join(current_app.static_folder, caminho))
+                >= current_app.config['COMPRESSAO_MINIMO']):
+            codificacao = codificacao_aceita(request.accept_encodings)
+        response = Response(self._conteudo(estado, caminho, codificacao), mimetype=mimetype)
+        if codificacao:
+            response.headers['Content-Encoding'] = codificacao
+        response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = f"public, max-age={current_app.config['ATIVOS_MAX_AGE']}, immutable"
+        response.set_etag(f'{nome}-{codificacao or "identity"}')
+        return response.make_conditional(request)
@@ -0,0 +1,372 @@
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, datetime
+import click
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from app import create_app
+from extensions import db
+from ledger import inicializar_banco, gravar_movimentacoes
+from models import Movimentacao, MODELOS
+import gerador
+import perfis
+import compressao
+
+ROTAS_LEITURA = ('/', '/extrato', '/api/v1/totais')
+
+
+def percentil(amostras, p):
+    if not amostras:
+        return 0.0
+    amostras = sorted(amostras)
+    return amostras[min(len(amostras) - 1, int(len(amostras) * p))]
+
+
+def memoria_pico_kb(requisicao):
+    # Pico de memória alocada pelo Python durante uma requisição (tracemalloc).
+    # Medido à parte das latências, que o rastreamento deixaria mais lentas;
+    # o RSS do processo só cresce e não separa uma rota da outra.
+    tracemalloc.start()
+    try:
+        requisicao()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def popular(linhas, semente, progresso=None):
+    inicializar_banco()
+    return gravar_movimentacoes(gerador.gerar_movimentacoes(linhas, semente), progresso=progresso)
+
+
+def dados_gerados(semente):
+    # Vai no JSON: identifica o banco sintético usado na medição
+    return {'semente': semente, 'fim': gerador.FIM_PADRAO.isoformat()}
+
+
+def contar_movimentacoes():
+    return db.session.execute(select(func.count()).select_from(Movimentacao)).scalar()
+
+
+@click.group()
+def cli():
+    """Benchmarks do Controle Financeiro."""
+
+
+@cli.command('gerar')
+@click.option('--url', required=True, help='Banco de destino (SQLite ou Postgres local).')
+@click.option('--escala', type=click.Choice(list(gerador.ESCALAS)), help='Tamanho nomeado.')
+@click.option('--linhas', type=int, help='Quantidade exata de movimentações (sobrepõe --escala).')
+@click.option('--semente', default=42, show_default=True)
+def gerar(url, escala, linhas, semente):
+    """Preenche o banco com movimentações sintéticas reproduzíveis."""
+    linhas = linhas or gerador.ESCALAS[escala or '10k']
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    with app.app_context():
+        total = popular(linhas, semente, progresso=lambda n, s: print(f'{n} linhas ({n / s:.0f} linhas/s)'))
+        print(f'{total} movimentações geradas; {contar_movimentacoes()} no banco')
+
+
+def _medir(cliente, requisicoes, repeticoes, aquecimento):
+    # requisicoes: função (i) -> resposta; devolve latências e queries por requisição
+    for i in range(aquecimento):
+        requisicoes(i)
+    latencias = []
+    queries = []
+    for i in range(aquecimento, aquecimento + repeticoes):
+        inicio = time.perf_counter()
+        resposta = requisicoes(i)
+        latencias.append(time.perf_counter() - inicio)
+        if resposta.status_code >= 400:
+            raise click.ClickException(f'{resposta.request.path}: HTTP {resposta.status_code}')
+        queries.append(int(resposta.headers.get('X-Query-Count', 0)))
+    return latencias, queries
+
+
+def rotas_benchmark(cliente, ano, mes, ids_exclusao):
+    return {
+        'dashboard': lambda i: cliente.get('/'),
+        'extrato': lambda i: cliente.get('/extrato'),
+        'extrato_filtrado': lambda i: cliente.get(f'/extrato?tipo=despesas&categoria=Alimentação'
+                                                  f'&data_inicio={ano}-01-01&valor_min=50'),
+        'relatorio_mensal': lambda i: cliente.post('/relatorio_mensal', data={'mes': mes, 'ano': ano}),
+        'relatorio_anual': lambda i: cliente.get(f'/relatorio_anual?ano={ano}'),
+        'excluir_movimentacao': lambda i: cliente.post('/excluir/{}/{}'.format(*ids_exclusao[i]))
+    }
+
+
+@cli.command('rotas')
+@click.option('--url', help='Banco já populado. Padrão: SQLite temporário com --linhas geradas.')
+@click.option('--linhas', default=gerador.ESCALAS['10k'], show_default=True)
+@click.option('--repeticoes', default=50, show_default=True)
+@click.option('--aquecimento', default=5, show_default=True)
+@click.option('--semente', default=42, show_default=True)
+@click.option('--saida', type=click.Path(dir_okay=False), help='Grava os resultados em JSON.')
+def rotas(url, linhas, repeticoes, aquecimento, semente, saida):
+    """Mede p50/p99, queries por requisição e pico de memória de cada rota."""
+    with tempfile.TemporaryDirectory() as diretorio:
+        temporario = url is None
+        url = url or 'sqlite:///' + os.path.join(diretorio, 'bench.db')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+        with app.app_context():
+            if temporario:
+                popular(linhas, semente)
+            total = contar_movimentacoes()
+            # Exclusões usam ids ativos distintos, sorteados entre os tipos
+            rnd = random.Random(semente)
+            candidatos = [tuple(linha) for linha in db.session.execute(
+                select(Movimentacao.tipo, Movimentacao.id).where(Movimentacao.ativo == True)
+                .limit((aquecimento + repeticoes) * len(MODELOS))
+            )]
+            # Uma exclusão a mais para a medição de memória
+            ids_exclusao = rnd.sample(candidatos, min(len(candidatos), aquecimento + repeticoes + 1))
+            db.session.remove()
+
+        # Mês de referência dos relatórios: o último dos dados gerados
+        referencia = gerador.FIM_PADRAO if temporario else date.today()
+        cliente = app.test_client()
+        resultados = {}
+        for nome, requisicoes in rotas_benchmark(cliente, referencia.year, referencia.month, ids_exclusao).items():
+            n = repeticoes if nome != 'excluir_movimentacao' else max(0, len(ids_exclusao) - aquecimento - 1)
+            latencias, queries = _medir(cliente, requisicoes, n, aquecimento)
+            resultados[nome] = {
+                'requisicoes': len(latencias),
+                'p50_ms': percentil(latencias, 0.50) * 1000,
+                'p99_ms': percentil(latencias, 0.99) * 1000,
+                'media_ms': statistics.fmean(latencias) * 1000 if latencias else 0.0,
+                'queries_por_requisicao': max(queries, default=0),
+                'memoria_pico_kb': memoria_pico_kb(lambda: requisicoes(aquecimento + n))
+            }
+            print(f"{nome:>22}: p50 {resultados[nome]['p50_ms']:8.2f} ms  p99 {resultados[nome]['p99_ms']:8.2f} ms  "
+                  f"{resultados[nome]['queries_por_requisicao']:3d} queries  "
+                  f"memória {resultados[nome]['memoria_pico_kb']:8.0f} KiB")
+        with app.app_context():
+            db.engine.dispose()
+
+    relatorio = {
+        'commit': commit_atual(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'banco': make_url(url).get_backend_name(),
+        'movimentacoes': total,
+        'dados': dados_gerados(semente) if temporario else None,
+        'python': platform.python_version(),
+        'repeticoes': repeticoes,
+        'rotas': resultados
+    }
+    if saida:
+        with open(saida, 'w') as f:
+            json.dump(relatorio, f, indent=2)
+
+
+@cli.command('comparar')
+@click.argument('antes', type=click.File())
+@click.argument('depois', type=click.File())
+@click.option('--tolerancia', default=0.2, show_default=True, help='Piora relativa de p50/p99 aceita.')
+def comparar(antes, depois, tolerancia):
+    """Compara dois resultados de `rotas`; sai com código 1 se houver regressão."""
+    antes, depois = json.load(antes), json.load(depois)
+    regressoes = []
+    print(f"{antes.get('commit')} -> {depois.get('commit')}")
+    for nome, novo in depois['rotas'].items():
+        velho = antes['rotas'].get(nome)
+        if not velho:
+            continue
+        for metrica in ('p50_ms', 'p99_ms'):
+            variacao = (novo[metrica] - velho[metrica]) / velho[metrica] if velho[metrica] else 0.0
+            if variacao > tolerancia:
+                regressoes.append(f'{nome} {metrica}')
+        if novo['queries_por_requisicao'] > velho['queries_por_requisicao']:
+            regressoes.append(f'{nome} queries')
+        print(f"{nome:>22}: p50 {velho['p50_ms']:.2f} -> {novo['p50_ms']:.2f} ms  "
+              f"p99 {velho['p99_ms']:.2f} -> {novo['p99_ms']:.2f} ms  "
+              f"queries {velho['queries_por_requisicao']} -> {novo['queries_por_requisicao']}")
+    if regressoes:
+        raise click.ClickException('Regressões: ' + ', '.join(regressoes))
+
+
+PAGINAS = ('/', '/extrato', '/adicionar', '/relatorio_categorias')
+CODIFICACOES = ('identity', 'gzip') + (('br',) if compressao.brotli else ())
+
+
+def _primeira_renderizacao(url, cache_dir):
+    # Worker novo: create_app + primeiro GET /, templates compilados do zero
+    # ou lidos do cache de bytecode
+    inicio = time.perf_counter()
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url, 'JINJA_CACHE_DIR': cache_dir})
+    resposta = app.test_client().get('/')
+    duracao = time.perf_counter() - inicio
+    if resposta.status_code >= 400:
+        raise click.ClickException(f'/: HTTP {resposta.status_code}')
+    with app.app_context():
+        db.engine.dispose()
+    return duracao
+
+
+@cli.command('paginas')
+@click.option('--url', help='Banco já populado. Padrão: SQLite temporário com --linhas geradas.')
+@click.option('--linhas', default=gerador.ESCALAS['10k'], show_default=True)
+@click.option('--repeticoes', default=5, show_default=True, help='Workers novos por modo de cache.')
+@click.option('--semente', default=42, show_default=True)
+@click.option('--saida', type=click.Path(dir_okay=False), help='Grava os resultados em JSON.')
+def paginas(url, linhas, repeticoes, semente, saida):
+    """Mede bytes transferidos por página (com e sem compressão) e o tempo até a primeira renderização."""
+    with tempfile.TemporaryDirectory() as diretorio:
+        temporario = url is None
+        url = url or 'sqlite:///' + os.path.join(diretorio, 'bench.db')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': url, 'JINJA_CACHE_DIR': ''})
+        with app.app_context():
+            if temporario:
+                popular(linhas, semente)
+            total = contar_movimentacoes()
+            db.session.remove()
+
+        # Página + assets que ela referencia; assets externos (CDN) não entram
+        cliente = app.test_client()
+        bytes_paginas = {}
+        for pagina in PAGINAS:
+            html = cliente.get(pagina).get_data(as_text=True)
+            caminhos = [pagina] + sorted(set(re.findall(r'(?:href|src)="(/ativos/[^"]+)"', html)))
+            bytes_paginas[pagina] = {
+                codificacao: sum(len(cliente.get(caminho, headers={'Accept-Encoding': codificacao}).data)
+                                 for caminho in caminhos)
+                for codificacao in CODIFICACOES
+            }
+            bytes_paginas[pagina]['assets_locais'] = len(caminhos) - 1
+            print(f"{pagina:>22}: " + '  '.join(f'{c} {bytes_paginas[pagina][c]:>8d} B' for c in CODIFICACOES))
+        with app.app_context():
+            db.engine.dispose()
+
+        renderizacao = {}
+        cache_dir = os.path.join(diretorio, 'jinja')
+        for modo in ('sem_cache', 'cache_frio', 'cache_quente'):
+            amostras = []
+            for i in range(repeticoes):
+                if modo == 'cache_frio':
+                    cache_dir = os.path.join(diretorio, f'jinja_{i}')
+                amostras.append(_primeira_renderizacao(url, '' if modo == 'sem_cache' else cache_dir))
+            renderizacao[modo] = {'p50_ms': percentil(amostras, 0.50) * 1000, 'media_ms': statistics.fmean(amostras) * 1000}
+            print(f"{modo:>22}: primeira renderização p50 {renderizacao[modo]['p50_ms']:.1f} ms")
+
+    relatorio = {
+        'commit': commit_atual(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'banco': make_url(url).get_backend_name(),
+        'movimentacoes': total,
+        'dados': dados_gerados(semente) if temporario else None,
+        'python': platform.python_version(),
+        'bytes': bytes_paginas,
+        'primeira_renderizacao': renderizacao
+    }
+    if saida:
+        with open(saida, 'w') as f:
+            json.dump(relatorio, f, indent=2)
+
+
+def _trabalhador(app, fim, proporcao_escrita, semente, resultado):
+    rnd = random.Random(semente)
+    cliente = app.test_client()
+    while time.perf_counter() < fim:
+        escrita = rnd.random() < proporcao_escrita
+        inicio = time.perf_counter()
+        if escrita:
+            resposta = cliente.post('/api/v1/movimentacoes', json={
+                'tipo': 'despesa',
+                'valor': f'{rnd.uniform(1, 500):.2f}',
+                'data': date.today().isoformat(),
+                'descricao': 'bench escrita',
+                'detalhe': 'Outros'
+            })
+        else:
+            resposta = cliente.get(rnd.choice(ROTAS_LEITURA))
+        duracao = time.perf_counter() - inicio
+        if resposta.status_code >= 500:
+            resultado['erros'] += 1
+        else:
+            resultado['escritas' if escrita else 'leituras'].append(duracao)
+
+
+def medir_perfil(perfil, url, threads, segundos, proporcao_escrita, linhas, semente):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url, 'DB_PERFIL': perfil})
+    with app.app_context():
+        popular(linhas, semente)
+        db.session.remove()
+
+    resultados = [{'leituras': [], 'escritas': [], 'erros': 0} for _ in range(threads)]
+    fim = time.perf_counter() + segundos
+    trabalhadores = [
+        threading.Thread(target=_trabalhador, args=(app, fim, proporcao_escrita, semente + i, resultados[i]))
+        for i in range(threads)
+    ]
+    for t in trabalhadores:
+        t.start()
+    for t in trabalhadores:
+        t.join()
+    with app.app_context():
+        db.engine.dispose()
+
+    leituras = [d for r in resultados for d in r['leituras']]
+    escritas = [d for r in resultados for d in r['escritas']]
+    return {
+        'perfil': perfil,
+        'banco': make_url(url).get_backend_name(),
+        'threads': threads,
+        'segundos': segundos,
+        'leituras_por_segundo': len(leituras) / segundos,
+        'escritas_por_segundo': len(escritas) / segundos,
+        'leitura_p50_ms': percentil(leituras, 0.50) * 1000,
+        'leitura_p99_ms': percentil(leituras, 0.99) * 1000,
+        'escrita_p50_ms': percentil(escritas, 0.50) * 1000,
+        'escrita_p99_ms': percentil(escritas, 0.99) * 1000,
+        'leitura_media_ms': statistics.fmean(leituras) * 1000 if leituras else 0.0,
+        'erros': sum(r['erros'] for r in resultados)
+    }
+
+
+@cli.command('concorrencia')
+@click.option('--perfil', 'perfis_escolhidos', multiple=True, type=click.Choice(list(perfis.PERFIS)),
+              help='Perfis a comparar. Padrão: todos.')
+@click.option('--url', help='Banco descartável (ex.: Postgres local). Padrão: um SQLite novo por perfil.')
+@click.option('--threads', default=8, show_default=True)
+@click.option('--segundos', default=10.0, show_default=True)
+@click.option('--escrita', 'proporcao_escrita', default=0.2, show_default=True, help='Fração de requisições de escrita.')
+@click.option('--linhas', default=20000, show_default=True, help='Movimentações semeadas antes da medição.')
+@click.option('--semente', default=42, show_default=True)
+@click.option('--saida', type=click.Path(dir_okay=False), help='Grava os resultados em JSON.')
+def concorrencia(perfis_escolhidos, url, threads, segundos, proporcao_escrita, linhas, semente, saida):
+    """Mede vazão de leitura/escrita concorrente com cada perfil de engine."""
+    resultados = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        for perfil in perfis_escolhidos or list(perfis.PERFIS):
+            # SQLite guarda o journal_mode no arquivo, então cada perfil usa um banco novo
+            url_perfil = url or 'sqlite:///' + os.path.join(diretorio, f'bench_{perfil}.db')
+            resultado = medir_perfil(perfil, url_perfil, threads, segundos, proporcao_escrita, linhas, semente)
+            resultados.append(resultado)
+            print(f"{perfil:>10}: {resultado['leituras_por_segundo']:8.1f} leituras/s "
+                  f"(p99 {resultado['leitura_p99_ms']:.1f} ms)  "
+                  f"{resultado['escritas_por_segundo']:7.1f} escritas/s "
+                  f"(p99 {resultado['escrita_p99_ms']:.1f} ms)  {resultado['erros']} erros")
+    if saida:
+        with open(saida, 'w') as f:
+            json.dump({'commit': commit_atual(), 'dados': dados_gerados(semente), 'resultados': resultados},
+                      f, indent=2)
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,170 @@
+import re
+import unicodedata
+from datetime import timedelta
+from sqlalchemy import bindparam, select, text
+from extensions import db
+from models import Movimentacao, MODELOS, DETALHES
+
+# Índice de busca textual mantido pela aplicação, como o resumo_mensal:
+# FTS5 no SQLite e tsvector + GIN no Postgres. Textos e termos são
+# normalizados sem acento dos dois lados.
+TABELA = 'busca_movimentacao'
+
+# Tabelas que o FTS5 cria junto com a virtual table (o Alembic deve ignorá-las)
+TABELAS_INTERNAS = {TABELA, f'{TABELA}_data', f'{TABELA}_idx', f'{TABELA}_content',
+                    f'{TABELA}_docsize', f'{TABELA}_config'}
+
+# No SQLite a chave é o rowid: id * 4 + índice do tipo, que permite filtrar
+# por tipo sem consultar a tabela de movimentações
+TIPOS = list(MODELOS)
+
+# Cartão só indexa a descrição; parcela não é texto pesquisável
+CAMPOS_TEXTO = {tipo: DETALHES[tipo].key for tipo in ('ganho', 'despesa', 'donativo')}
+
+BUSCA_LIMITE_PADRAO = 20
+BUSCA_LIMITE_MAXIMO = 100
+
+_PALAVRA = re.compile(r'\w+')
+
+
+def _dialeto():
+    return db.session.get_bind().dialect.name
+
+
+def normalizar_texto(texto):
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def texto_indexado(tipo, descricao, detalhe):
+    partes = [descricao]
+    if tipo in CAMPOS_TEXTO:
+        partes.append(detalhe)
+    return normalizar_texto(' '.join(p for p in partes if p))
+
+
+def criar_indice():
+    if _dialeto() == 'postgresql':
+        db.session.execute(text(
+            f'CREATE TABLE IF NOT EXISTS {TABELA} ('
+            'tipo VARCHAR(10) NOT NULL, mov_id INTEGER NOT NULL, data DATE NOT NULL, '
+            'documento TSVECTOR NOT NULL, PRIMARY KEY (tipo, mov_id))'
+        ))
+        db.session.execute(text(
+            f'CREATE INDEX IF NOT EXISTS ix_{TABELA}_documento ON {TABELA} USING gin (documento)'
+        ))
+    else:
+        db.session.execute(text(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA} USING fts5('
+            "texto, data UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+
+
+def remover_indice():
+    db.session.execute(text(f'DROP TABLE IF EXISTS {TABELA}'))
+
+
+def indexar(movimentacoes):
+    # movimentacoes: dicts com tipo, id, data, descricao e detalhe; não faz commit
+    if not movimentacoes:
+        return
+    if _dialeto() == 'postgresql':
+        db.session.execute(text(
+            f'INSERT INTO {TABELA} (tipo, mov_id, data, documento) '
+            "VALUES (:tipo, :id, :data, to_tsvector('portuguese', :texto)) "
+            'ON CONFLICT (tipo, mov_id) DO UPDATE SET data = excluded.data, documento = excluded.documento'
+        ), [{'tipo': m['tipo'], 'id': m['id'], 'data': m['data'],
+             'texto': texto_indexado(m['tipo'], m['descricao'], m['detalhe'])} for m in movimentacoes])
+    else:
+        db.session.execute(text(
+            f'INSERT OR REPLACE INTO {TABELA} (rowid, texto, data) VALUES (:rowid, :texto, :data)'
+        ), [{'rowid': m['id'] * len(TIPOS) + TIPOS.index(m['tipo']), 'data': m['data'].isoformat(),
+             'texto': texto_indexado(m['tipo'], m['descricao'], m['detalhe'])} for m in movimentacoes])
+
+
+def remover(tipo, ids):
+    if not ids:
+        return
+    if _dialeto() == 'postgresql':
+        db.session.execute(text(f'DELETE FROM {TABELA} WHERE tipo = :tipo AND mov_id = :id'),
+                           [{'tipo': tipo, 'id': id} for id in ids])
+    else:
+        db.session.execute(text(f'DELETE FROM {TABELA} WHERE rowid = :rowid'),
+                           [{'rowid': id * len(TIPOS) + TIPOS.index(tipo)} for id in ids])
+
+
+def reconstruir_indice(tamanho_lote=5000):
+    remover_indice()
+    criar_indice()
+    consulta = db.session.execute(
+        select(Movimentacao.tipo, Movimentacao.id, Movimentacao.data, Movimentacao.descricao, Movimentacao.detalhe)
+        .where(Movimentacao.ativo == True)
+        .execution_options(yield_per=tamanho_lote)
+    )
+    for parte in consulta.partitions():
+        indexar([dict(linha._mapping) for linha in parte])
+    db.session.commit()
+
+
+def vazio():
+    return db.session.execute(text(f'SELECT 1 FROM {TABELA} LIMIT 1')).first() is None
+
+
+def termos(consulta):
+    return _PALAVRA.findall(normalizar_texto(consulta))
+
+
+def buscar(consulta, tipos=None, data_inicio=None, data_fim=None, pagina=1, limite=BUSCA_LIMITE_PADRAO):
+    # Devolve [(tipo, id)] ordenados por relevância e se há próxima página.
+    # Cada termo casa por prefixo ("ifo" encontra "iFood") e todos precisam casar.
+    palavras = termos(consulta)
+    if not palavras:
+        return [], False
+    tipos = [t for t in (tipos or TIPOS) if t in MODELOS]
+    if not tipos:
+        return [], False
+    parametros = {'limite': limite + 1, 'offset': (pagina - 1) * limite}
+    filtros = []
+    if data_fim:
+        # Intervalo semiaberto, como no extrato
+        data_fim = data_fim + timedelta(days=1)
+
+    if _dialeto() == 'postgresql':
+        parametros['consulta'] = ' & '.join(f'{p}:*' for p in palavras)
+        if len(tipos) < len(TIPOS):
+            filtros.append('tipo IN :tipos')
+            parametros['tipos'] = tuple(tipos)
+        if data_inicio:
+            filtros.append('data >= :data_inicio')
+            parametros['data_inicio'] = data_inicio
+        if data_fim:
+            filtros.append('data < :data_fim')
+            parametros['data_fim'] = data_fim
+        sql = (
+            f'SELECT tipo, mov_id FROM {TABELA}, to_tsquery(\'portuguese\', :consulta) AS q '
+            'WHERE documento @@ q' + ''.join(f' AND {f}' for f in filtros) +
+            ' ORDER BY ts_rank(documento, q) DESC, data DESC, mov_id DESC LIMIT :limite OFFSET :offset'
+        )
+        stmt = text(sql)
+        if 'tipos' in parametros:
+            stmt = stmt.bindparams(bindparam('tipos', expanding=True))
+        linhas = [(linha.tipo, linha.mov_id) for linha in db.session.execute(stmt, parametros)]
+    else:
+        parametros['consulta'] = ' '.join(f'"{p}"*' for p in palavras)
+        if len(tipos) < len(TIPOS):
+            filtros.append(f'rowid % {len(TIPOS)} IN ({", ".join(str(TIPOS.index(t)) for t in tipos)})')
+        if data_inicio:
+            filtros.append('data >= :data_inicio')
+            parametros['data_inicio'] = data_inicio.isoformat()
+        if data_fim:
+            filtros.append('data < :data_fim')
+            parametros['data_fim'] = data_fim.isoformat()
+        sql = (
+            f'SELECT rowid FROM {TABELA} WHERE {TABELA} MATCH :consulta' +
+            ''.join(f' AND {f}' for f in filtros) +
+            ' ORDER BY rank, data DESC, rowid DESC LIMIT :limite OFFSET :offset'
+        )
+        linhas = [(TIPOS[rowid % len(TIPOS)], rowid // len(TIPOS))
+                  for rowid in db.session.execute(text(sql), parametros).scalars()]
+
+    return linhas[:limite], len(linhas) > limite
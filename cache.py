@@ -0,0 +1,128 @@
+import json
+import threading
+import time
+from decimal import Decimal
+
+
+# Backend padrão: snapshot mantido na memória do próprio worker
+class MemoriaBackend:
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def ler(self):
+        return self._snapshot
+
+    def gravar(self, snapshot):
+        self._snapshot = snapshot
+
+    def apagar(self):
+        self._snapshot = None
+
+    def lock(self):
+        return self._lock
+
+
+# Backend compartilhado entre workers (opcional, requer o pacote redis)
+class RedisBackend:
+    def __init__(self, url, chave='financas:totais'):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._chave = chave
+
+    def ler(self):
+        raw = self._redis.get(self._chave)
+        if not raw:
+            return None
+        snapshot = json.loads(raw)
+        snapshot['totais'] = {chave: Decimal(valor) for chave, valor in snapshot['totais'].items()}
+        return snapshot
+
+    def gravar(self, snapshot):
+        # Decimal vai como string para não perder precisão
+        self._redis.set(self._chave, json.dumps(snapshot, default=str))
+
+    def apagar(self):
+        self._redis.delete(self._chave)
+
+    def lock(self):
+        return self._redis.lock(self._chave + ':lock', timeout=5)
+
+
+def criar_backend(url=None):
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    return MemoriaBackend()
+
+
+class CacheTotais:
+    # Guarda {'versao': n, 'totais': {...}}. A versão vem do banco (versao_dados),
+    # então um worker com snapshot antigo percebe a divergência e recalcula.
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoriaBackend()
+
+    def obter(self, versao):
+        snapshot = self.backend.ler()
+        if snapshot and snapshot['versao'] == versao:
+            return dict(snapshot['totais'])
+        return None
+
+    def definir(self, versao, totais):
+        self.backend.gravar({'versao': versao, 'totais': dict(totais)})
+
+    def aplicar(self, versao, chave, delta):
+        # Write-through incremental: só aplica se o snapshot estiver exatamente
+        # uma versão atrás; caso contrário descarta e deixa o próximo leitor recalcular.
+        with self.backend.lock():
+            snapshot = self.backend.ler()
+            if not snapshot or snapshot['versao'] != versao - 1:
+                self.backend.apagar()
+                return
+            totais = snapshot['totais']
+            totais[chave] += delta
+            totais['saldo'] = totais['ganhos'] - totais['despesas'] - totais['cartao'] - totais['donativos']
+            self.backend.gravar({'versao': versao, 'totais': totais})
+
+    def invalidar(self):
+        self.backend.apagar()
+
+
+class RegistroCategorias:
+    # Categorias de despesa carregadas uma vez por worker. A versão fica em
+    # versao_dados e só é reconsultada a cada `intervalo` segundos, então o
+    # formulário normalmente renderiza sem tocar o banco; escritas do próprio
+    # worker entram no registro logo após o commit.
+
+    def __init__(self, intervalo=5.0):
+        self.intervalo = intervalo
+        self._versao = None
+        self._nomes = ()
+        self._verificado_em = 0.0
+        self._lock = threading.Lock()
+
+    def obter(self, versao_atual, carregar):
+        # versao_atual() e carregar() consultam o banco; só são chamadas quando
+        # o intervalo venceu ou o registro ainda está vazio
+        if self._versao is not None and time.monotonic() - self._verificado_em < self.intervalo:
+            return self._nomes
+        with self._lock:
+            versao = versao_atual()
+            if versao != self._versao:
+                self._nomes = tuple(carregar())
+                self._versao = versao
+            self._verificado_em = time.monotonic()
+            return self._nomes
+
+    def adicionar(self, versao, nomes):
+        # Como CacheTotais.aplicar: só aplica se o registro estiver exatamente
+        # uma versão atrás; caso contrário força a recarga
+        with self._lock:
+            if self._versao != versao - 1:
+                self._versao = None
+                return
+            self._nomes = tuple(sorted({*self._nomes, *nomes}))
+            self._versao = versao
+
+    def invalidar(self):
+        self._versao = None
@@ -0,0 +1,95 @@
+import time
+import click
+from flask.cli import with_appcontext
+from models import ResumoMensal
+from ledger import (IMPORTACAO_LOTE_PADRAO, ARQUIVO_LOTE_PADRAO, inicializar_banco, reconstruir_resumo,
+                    importar_movimentacoes, materializar_recorrencias, arquivar_inativos, arquivar_ano,
+                    restaurar_ano, compactar)
+import importacao
+import busca
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Cria as tabelas e semeia categorias padrão (idempotente)."""
+    inicializar_banco()
+    click.echo('Banco inicializado.')
+
+
+@click.command('rebuild-resumo')
+@with_appcontext
+def rebuild_resumo_command():
+    """Recalcula a tabela resumo_mensal a partir das movimentações."""
+    reconstruir_resumo()
+    click.echo(f'resumo_mensal reconstruído: {ResumoMensal.query.count()} linhas')
+
+
+@click.command('rebuild-busca')
+@with_appcontext
+def rebuild_busca_command():
+    """Recria o índice de busca textual a partir das movimentações ativas."""
+    busca.reconstruir_indice()
+    click.echo('Índice de busca reconstruído.')
+
+
+@click.command('importar')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--formato', type=click.Choice(importacao.FORMATOS), help='Padrão: extensão do arquivo.')
+@click.option('--lote', default=IMPORTACAO_LOTE_PADRAO, show_default=True, help='Linhas por INSERT em lote.')
+@click.option('--encoding', default='utf-8-sig', show_default=True)
+@with_appcontext
+def importar_command(arquivo, formato, lote, encoding):
+    """Importa um extrato bancário CSV ou OFX."""
+    formato = importacao.formato_arquivo(arquivo, formato)
+    with open(arquivo, encoding=encoding, errors='replace', newline='') as f:
+        relatorio = importar_movimentacoes(
+            importacao.ler(f, formato), lote,
+            progresso=lambda n, s: click.echo(f'{n} linhas importadas ({n / s:.0f} linhas/s)')
+        )
+    for numero, erro in relatorio['erros']:
+        click.echo(f'linha {numero}: {erro}')
+    click.echo(f"{relatorio['importadas']} importadas, {relatorio['total_erros']} com erro "
+          f"em {relatorio['segundos']:.1f}s ({relatorio['linhas_por_segundo']:.0f} linhas/s)")
+
+
+@click.command('materializar-recorrencias')
+@click.option('--ate', type=click.DateTime(formats=['%Y-%m-%d']), help='Data limite (padrão: hoje).')
+@click.option('--lote', default=IMPORTACAO_LOTE_PADRAO, show_default=True, help='Linhas por INSERT em lote.')
+@with_appcontext
+def materializar_recorrencias_command(ate, lote):
+    """Gera os lançamentos devidos das regras recorrentes (idempotente)."""
+    inicio = time.perf_counter()
+    geradas = materializar_recorrencias(ate.date() if ate else None, lote)
+    click.echo(f'{geradas} lançamentos gerados em {time.perf_counter() - inicio:.1f}s')
+
+
+@click.command('arquivar')
+@click.option('--ano', 'anos', type=int, multiple=True, help='Arquiva também um ano fechado (repetível).')
+@click.option('--lote', default=ARQUIVO_LOTE_PADRAO, show_default=True, help='Linhas movidas por transação.')
+@click.option('--compactar', 'compactar_banco', is_flag=True, help='Roda VACUUM/ANALYZE ao final.')
+@with_appcontext
+def arquivar_command(anos, lote, compactar_banco):
+    """Move movimentações excluídas (e anos fechados) para movimentacao_arquivo."""
+    inicio = time.perf_counter()
+    try:
+        arquivadas = arquivar_inativos(lote) + sum(arquivar_ano(ano, lote) for ano in anos)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--ano')
+    click.echo(f'{arquivadas} movimentações arquivadas em {time.perf_counter() - inicio:.1f}s')
+    if compactar_banco:
+        compactar()
+        click.echo('Banco compactado.')
+
+
+@click.command('restaurar-ano')
+@click.argument('ano', type=int)
+@click.option('--lote', default=ARQUIVO_LOTE_PADRAO, show_default=True, help='Linhas movidas por transação.')
+@with_appcontext
+def restaurar_ano_command(ano, lote):
+    """Devolve as movimentações ativas de um ano arquivado à tabela quente."""
+    click.echo(f'{restaurar_ano(ano, lote)} movimentações restauradas')
+
+
+COMANDOS = [init_db_command, rebuild_resumo_command, rebuild_busca_command, importar_command,
+            materializar_recorrencias_command, arquivar_command, restaurar_ano_command]
@@ -0,0 +1,60 @@
+import gzip
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # opcional: sem o pacote, só gzip
+    brotli = None
+
+COMPRESSIVEIS = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+
+
+def codificacao_aceita(accept_encoding):
+    # Brotli comprime melhor; gzip todo navegador aceita
+    if brotli is not None and accept_encoding['br']:
+        return 'br'
+    if accept_encoding['gzip']:
+        return 'gzip'
+    return None
+
+
+def comprimir(dados, codificacao, nivel):
+    if codificacao == 'br':
+        return brotli.compress(dados, quality=nivel['br'])
+    return gzip.compress(dados, compresslevel=nivel['gzip'], mtime=0)
+
+
+def compressivel(mimetype):
+    return mimetype is not None and mimetype.startswith(COMPRESSIVEIS)
+
+
+class Compressao:
+    # gzip/brotli das respostas dinâmicas acima de COMPRESSAO_MINIMO bytes.
+    # Respostas em streaming (exportação do extrato) e arquivos enviados
+    # direto do disco passam intactos; os assets estáticos têm a própria
+    # versão comprimida em cache (ver ativos.py).
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESSAO_MINIMO', 1024)
+        # Respostas dinâmicas são comprimidas a cada requisição: níveis
+        # médios; os assets, comprimidos uma vez só, usam o máximo
+        app.config.setdefault('COMPRESSAO_NIVEL', {'gzip': 6, 'br': 5})
+        app.after_request(self._depois)
+
+    def _depois(self, response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers
+                or not compressivel(response.mimetype)):
+            return response
+        response.vary.add('Accept-Encoding')
+        codificacao = codificacao_aceita(request.accept_encodings)
+        if codificacao is None or (response.calculate_content_length() or 0) < current_app.config['COMPRESSAO_MINIMO']:
+            return response
+        response.set_data(comprimir(response.get_data(), codificacao, current_app.config['COMPRESSAO_NIVEL']))
+        response.headers['Content-Encoding'] = codificacao
+        # O corpo comprimido não é byte a byte o original: o ETag vira fraco
+        etag, fraco = response.get_etag()
+        if etag and not fraco:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,14 @@
+from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
+from cache import CacheTotais, RegistroCategorias
+from instrumentacao import Instrumentacao
+from compressao import Compressao
+from ativos import Ativos
+
+db = SQLAlchemy()
+migrate = Migrate()
+cache_totais = CacheTotais()
+registro_categorias = RegistroCategorias()
+instrumentacao = Instrumentacao()
+compressao = Compressao()
+ativos = Ativos()
@@ -0,0 +1,85 @@
+import math
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from importacao import LIMITE_DETALHE
+from models import CENTAVO
+
+# Escalas nomeadas para o benchmark
+ESCALAS = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000
+}
+
+# Participação de cada tipo no volume de movimentações
+PESOS_TIPO = {
+    'despesa': 0.55,
+    'cartao': 0.30,
+    'ganho': 0.10,
+    'donativo': 0.05
+}
+
+# (mediana, sigma) da lognormal de valores por tipo
+VALORES = {
+    'despesa': (60, 1.0),
+    'cartao': (120, 0.9),
+    'ganho': (3500, 0.6),
+    'donativo': (50, 0.8)
+}
+
+DETALHES = {
+    'despesa': {'Alimentação': 35, 'Transporte': 20, 'Moradia': 10, 'Lazer': 12, 'Saúde': 8,
+                'Outros': 8, 'Educação': 4, 'Assinaturas': 2, 'Pets': 1},
+    'ganho': {'Salário': 70, 'Freelance': 15, 'Investimentos': 10, 'Outros': 5},
+    'donativo': {'Cruz Vermelha': 30, 'Médicos Sem Fronteiras': 25, 'Igreja': 25, 'Não informada': 20}
+}
+
+DESCRICOES = {
+    'despesa': ('Mercado', 'Padaria', 'Uber', 'Combustível', 'Aluguel', 'Cinema', 'Farmácia', 'Restaurante'),
+    'cartao': ('Loja online', 'Eletrônicos', 'Roupas', 'Viagem', 'Supermercado', 'Streaming'),
+    'ganho': ('Pagamento', 'Projeto', 'Dividendos', 'Reembolso'),
+    'donativo': ('Doação mensal', 'Campanha', 'Oferta')
+}
+
+
+def _escolher(rnd, pesos):
+    return rnd.choices(list(pesos), weights=list(pesos.values()))[0]
+
+
+def _parcela(rnd):
+    if rnd.random() < 0.7:
+        return 'À vista'
+    total = rnd.choice((2, 3, 4, 5, 6, 10, 12))
+    return f'{rnd.randint(1, total)}/{total}'
+
+
+# Último dia dos dados gerados. Fixo, e não a data de hoje: a mesma semente
+# gera o mesmo banco em qualquer dia, e benchmarks de dias diferentes comparam
+FIM_PADRAO = date(2025, 12, 31)
+
+
+def gerar_movimentacoes(linhas, semente=42, anos=3, fim=None):
+    # Gera dicts no formato de importacao.normalizar(), reproduzíveis pela semente
+    rnd = random.Random(semente)
+    fim = fim or FIM_PADRAO
+    dias = anos * 365
+    inicio = fim - timedelta(days=dias - 1)
+    tipos = list(PESOS_TIPO)
+    pesos = list(PESOS_TIPO.values())
+    for _ in range(linhas):
+        tipo = rnd.choices(tipos, weights=pesos)[0]
+        mediana, sigma = VALORES[tipo]
+        data = inicio + timedelta(days=rnd.randrange(dias))
+        if tipo == 'ganho' and rnd.random() < 0.6:
+            # Salário cai perto do 5º dia útil
+            data = min(data.replace(day=rnd.randint(3, 7)), fim)
+        valor = Decimal(max(rnd.lognormvariate(math.log(mediana), sigma), 0.01)).quantize(CENTAVO)
+        detalhe = _parcela(rnd) if tipo == 'cartao' else _escolher(rnd, DETALHES[tipo])
+        yield {
+            'tipo': tipo,
+            'valor': valor,
+            'data': data,
+            'descricao': rnd.choice(DESCRICOES[tipo]),
+            'detalhe': detalhe[:LIMITE_DETALHE[tipo]]
+        }
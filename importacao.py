@@ -0,0 +1,194 @@
+import csv
+import os
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+FORMATOS = ('csv', 'ofx')
+
+# Aliases aceitos na coluna "tipo" do CSV
+TIPOS = {
+    'ganho': 'ganho', 'ganhos': 'ganho', 'receita': 'ganho', 'credito': 'ganho',
+    'despesa': 'despesa', 'despesas': 'despesa', 'debito': 'despesa',
+    'cartao': 'cartao', 'cartão': 'cartao', 'cartao_credito': 'cartao',
+    'donativo': 'donativo', 'donativos': 'donativo', 'doacao': 'donativo', 'doação': 'donativo'
+}
+
+# Colunas do CSV que preenchem origem/categoria/parcela/instituição
+COLUNAS_DETALHE = ('categoria', 'origem', 'parcela', 'instituicao', 'instituição')
+
+LIMITE_DETALHE = {
+    'ganho': 50,
+    'despesa': 50,
+    'cartao': 20,
+    'donativo': 100
+}
+
+DETALHE_PADRAO = {
+    'ganho': 'Outros',
+    'despesa': 'Outros',
+    'cartao': 'À vista',
+    'donativo': 'Não informada'
+}
+
+FORMATOS_DATA = ('%Y-%m-%d', '%d/%m/%Y', '%d/%m/%y', '%Y%m%d')
+
+_TAG_OFX = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+# Maior parcelamento aceito; também limita a projeção de faturas
+PARCELAS_MAX = 48
+
+_PARCELA = re.compile(r'^\s*(\d{1,3})\s*(?:/|de)\s*(\d{1,3})\s*$', re.IGNORECASE)
+
+
+def parse_valor(texto):
+    texto = texto.strip().replace('R$', '').replace(' ', '')
+    if ',' in texto and texto.rfind('.') > texto.rfind(','):
+        # Milhar com vírgula (1,234.56), como alguns bancos exportam
+        texto = texto.replace(',', '')
+    elif ',' in texto:
+        # Formato brasileiro: 1.234,56
+        texto = texto.replace('.', '').replace(',', '.')
+    try:
+        valor = Decimal(texto)
+    except InvalidOperation:
+        raise ValueError(f'Valor inválido: {texto!r}')
+    if not valor.is_finite():
+        raise ValueError(f'Valor inválido: {texto!r}')
+    return valor
+
+
+def parse_data(texto):
+    texto = texto.strip()
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Data inválida: {texto!r}')
+
+
+def parse_parcela(texto):
+    # "3/10" ou "3 de 10" -> (3, 10); qualquer outra coisa ("À vista") -> (1, 1)
+    match = _PARCELA.match(texto or '')
+    if not match:
+        return 1, 1
+    numero, total = int(match.group(1)), int(match.group(2))
+    if not 1 <= numero <= total <= PARCELAS_MAX:
+        return 1, 1
+    return numero, total
+
+
+def normalizar(registro):
+    # Converte um registro bruto (strings) nos campos de uma movimentação.
+    # Levanta ValueError para que o importador registre o erro da linha.
+    if registro.get('erro'):
+        raise ValueError(registro['erro'])
+    if not registro.get('data'):
+        raise ValueError('Coluna "data" vazia')
+    if not registro.get('valor'):
+        raise ValueError('Coluna "valor" vazia')
+    data = parse_data(registro['data'])
+    valor = parse_valor(registro['valor'])
+
+    tipo_bruto = (registro.get('tipo') or '').strip().lower()
+    if tipo_bruto:
+        tipo = TIPOS.get(tipo_bruto)
+        if not tipo:
+            raise ValueError(f'Tipo inválido: {tipo_bruto!r}')
+    else:
+        tipo = 'ganho' if valor >= 0 else 'despesa'
+
+    valor = abs(valor)
+    if valor == 0:
+        raise ValueError('Valor zero')
+
+    detalhe = next((registro[c].strip() for c in COLUNAS_DETALHE if (registro.get(c) or '').strip()), None)
+    return {
+        'tipo': tipo,
+        'valor': valor,
+        'data': data,
+        'descricao': (registro.get('descricao') or registro.get('descrição') or '').strip()[:200],
+        'detalhe': (detalhe or DETALHE_PADRAO[tipo])[:LIMITE_DETALHE[tipo]]
+    }
+
+
+def ler_csv(arquivo):
+    # Gera (número da linha, registro) sem carregar o arquivo inteiro
+    cabecalho = arquivo.readline()
+    delimitador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+    colunas = [c.strip().lower() for c in next(csv.reader([cabecalho], delimiter=delimitador))]
+    for numero, valores in enumerate(csv.reader(arquivo, delimiter=delimitador), start=2):
+        if not any(v.strip() for v in valores):
+            continue
+        yield numero, dict(zip(colunas, valores))
+
+
+def _tokens_ofx(arquivo, tamanho_bloco=64 * 1024):
+    # OFX 1.x é SGML e pode vir todo numa linha só; lê em blocos e
+    # preserva a tag incompleta no fim de cada bloco
+    resto = ''
+    while True:
+        bloco = arquivo.read(tamanho_bloco)
+        if not bloco:
+            break
+        resto += bloco
+        corte = resto.rfind('<')
+        if corte < 0:
+            continue
+        for match in _TAG_OFX.finditer(resto, 0, corte):
+            yield match.group(1) == '/', match.group(2).upper(), match.group(3).strip()
+        resto = resto[corte:]
+    for match in _TAG_OFX.finditer(resto):
+        yield match.group(1) == '/', match.group(2).upper(), match.group(3).strip()
+
+
+def ler_ofx(arquivo):
+    cartao = False
+    transacao = None
+    numero = 0
+    for fechamento, tag, texto in _tokens_ofx(arquivo):
+        if tag == 'CCSTMTRS' and not fechamento:
+            cartao = True
+        elif tag == 'STMTRS' and not fechamento:
+            cartao = False
+        elif tag == 'STMTTRN':
+            if not fechamento:
+                transacao = {}
+                numero += 1
+            elif transacao is not None:
+                yield numero, _registro_ofx(transacao, cartao)
+                transacao = None
+        elif transacao is not None and not fechamento:
+            transacao[tag] = texto
+
+
+def _registro_ofx(transacao, cartao):
+    valor = transacao.get('TRNAMT', '')
+    registro = {
+        'data': transacao.get('DTPOSTED', '')[:8],
+        'valor': valor,
+        'descricao': transacao.get('MEMO') or transacao.get('NAME') or ''
+    }
+    if cartao:
+        if valor.strip().startswith('-'):
+            registro['tipo'] = 'cartao'
+        else:
+            # Pagamentos/estornos da fatura não são ganhos
+            registro['erro'] = 'Crédito em fatura de cartão ignorado'
+    return registro
+
+
+def formato_arquivo(nome, formato=None):
+    formato = (formato or os.path.splitext(nome or '')[1].lstrip('.')).lower()
+    if formato not in FORMATOS:
+        raise ValueError(f'Formato não suportado: {formato or nome}')
+    return formato
+
+
+def ler(arquivo, formato):
+    if formato == 'csv':
+        return ler_csv(arquivo)
+    if formato == 'ofx':
+        return ler_ofx(arquivo)
+    raise ValueError(f'Formato não suportado: {formato}')
@@ -0,0 +1,214 @@
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request, Response
+from flask.signals import before_render_template, request_started, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Buckets (segundos) do histograma de duração das requisições
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TAMANHO_MAX_STATEMENT = 500
+
+# Listas ativas de capturar_queries(), usadas em testes fora de requisição
+_capturas = []
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _inicio_query(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('inicio_query', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _fim_query(conn, cursor, statement, parameters, context, executemany):
+    duracao = time.perf_counter() - conn.info['inicio_query'].pop()
+    for captura in _capturas:
+        captura.append(statement)
+    if not has_request_context():
+        return
+    g.query_count = g.get('query_count', 0) + 1
+    g.sql_tempo = g.get('sql_tempo', 0.0) + duracao
+    if duracao > g.get('query_mais_lenta', (0.0, None))[0]:
+        g.query_mais_lenta = (duracao, statement)
+
+
+@contextmanager
+def capturar_queries():
+    # Para testes de regressão N+1:
+    #     with capturar_queries() as queries:
+    #         client.get('/extrato')
+    #     assert len(queries) <= 3
+    queries = []
+    _capturas.append(queries)
+    try:
+        yield queries
+    finally:
+        _capturas.remove(queries)
+
+
+def _inicio_template(app, template, context, **extra):
+    if has_request_context():
+        g.inicio_template = time.perf_counter()
+
+
+def _fim_template(app, template, context, **extra):
+    if has_request_context() and 'inicio_template' in g:
+        g.template_tempo = g.get('template_tempo', 0.0) + time.perf_counter() - g.pop('inicio_template')
+
+
+def _rotulos(rotulos):
+    return '{' + ','.join(f'{chave}="{valor}"' for chave, valor in rotulos.items()) + '}'
+
+
+class Metricas:
+    # Agregado por endpoint, na memória do worker (cada processo expõe o seu)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dados = defaultdict(lambda: {
+            'status': defaultdict(int),
+            'buckets': [0] * len(BUCKETS),
+            'contagem': 0,
+            'segundos': 0.0,
+            'queries': 0,
+            'sql_segundos': 0.0,
+            'query_mais_lenta': 0.0,
+            'template_segundos': 0.0,
+            'bytes': 0
+        })
+
+    def registrar(self, endpoint, status, amostra):
+        with self._lock:
+            dados = self._dados[endpoint]
+            dados['status'][status] += 1
+            dados['contagem'] += 1
+            dados['segundos'] += amostra['total']
+            for i, limite in enumerate(BUCKETS):
+                if amostra['total'] <= limite:
+                    dados['buckets'][i] += 1
+            dados['queries'] += amostra['queries']
+            dados['sql_segundos'] += amostra['sql']
+            dados['query_mais_lenta'] = max(dados['query_mais_lenta'], amostra['query_mais_lenta'])
+            dados['template_segundos'] += amostra['template']
+            dados['bytes'] += amostra['bytes'] or 0
+
+    def prometheus(self):
+        with self._lock:
+            dados = {endpoint: dict(valores, status=dict(valores['status']), buckets=list(valores['buckets']))
+                     for endpoint, valores in self._dados.items()}
+
+        linhas = []
+
+        def metrica(nome, tipo, ajuda, amostras):
+            linhas.append(f'# HELP {nome} {ajuda}')
+            linhas.append(f'# TYPE {nome} {tipo}')
+            for rotulos, valor in amostras:
+                linhas.append(f'{nome}{_rotulos(rotulos)} {valor}')
+
+        metrica('financas_requisicoes_total', 'counter', 'Requisições atendidas.',
+                [({'endpoint': e, 'status': s}, n) for e, d in dados.items() for s, n in sorted(d['status'].items())])
+
+        histograma = []
+        for endpoint, d in dados.items():
+            for limite, n in zip(BUCKETS, d['buckets']):
+                histograma.append(('_bucket', {'endpoint': endpoint, 'le': limite}, n))
+            histograma.append(('_bucket', {'endpoint': endpoint, 'le': '+Inf'}, d['contagem']))
+            histograma.append(('_sum', {'endpoint': endpoint}, d['segundos']))
+            histograma.append(('_count', {'endpoint': endpoint}, d['contagem']))
+        linhas.append('# HELP financas_requisicao_segundos Duração das requisições.')
+        linhas.append('# TYPE financas_requisicao_segundos histogram')
+        for sufixo, rotulos, valor in histograma:
+            linhas.append(f'financas_requisicao_segundos{sufixo}{_rotulos(rotulos)} {valor}')
+
+        for nome, chave, tipo, ajuda in (
+            ('financas_sql_queries_total', 'queries', 'counter', 'Queries SQL executadas.'),
+            ('financas_sql_segundos_total', 'sql_segundos', 'counter', 'Tempo gasto em SQL.'),
+            ('financas_sql_query_mais_lenta_segundos', 'query_mais_lenta', 'gauge', 'Query mais lenta já vista.'),
+            ('financas_template_segundos_total', 'template_segundos', 'counter', 'Tempo de renderização de templates.'),
+            ('financas_resposta_bytes_total', 'bytes', 'counter', 'Bytes de resposta (sem streaming).')
+        ):
+            metrica(nome, tipo, ajuda, [({'endpoint': e}, d[chave]) for e, d in dados.items()])
+        return '\n'.join(linhas) + '\n'
+
+
+class Instrumentacao:
+    # Liga com INSTRUMENTACAO=true. X-Query-Count sai sempre; Server-Timing,
+    # log estruturado e /metrics só com a instrumentação ligada.
+
+    def __init__(self):
+        self.metricas = Metricas()
+
+    def init_app(self, app):
+        # Sinal e não before_request: roda antes dos before_request dos
+        # blueprints, cujas queries também contam
+        request_started.connect(self._antes, app)
+        app.after_request(self._depois)
+        if app.config.get('INSTRUMENTACAO'):
+            # A linha de log por requisição é INFO
+            if not app.logger.isEnabledFor(logging.INFO):
+                app.logger.setLevel(logging.INFO)
+            before_render_template.connect(_inicio_template, app)
+            template_rendered.connect(_fim_template, app)
+            app.add_url_rule('/metrics', 'metrics', self._exportar)
+
+    def _antes(self, sender, **extra):
+        # Zera os contadores: com um app context já ativo (testes, scripts) o
+        # `g` é o mesmo em todas as requisições
+        g.inicio_requisicao = time.perf_counter()
+        g.query_count = 0
+        g.sql_tempo = 0.0
+        g.pop('query_mais_lenta', None)
+        g.pop('template_tempo', None)
+
+    def _depois(self, response):
+        queries = g.get('query_count', 0)
+        response.headers['X-Query-Count'] = str(queries)
+
+        limite = current_app.config.get('INSTRUMENTACAO_LIMITE_QUERIES')
+        if limite and queries > limite:
+            mensagem = f'{request.endpoint}: {queries} queries (limite {limite}), possível N+1'
+            if current_app.testing:
+                raise AssertionError(mensagem)
+            current_app.logger.warning(mensagem)
+
+        if not current_app.config.get('INSTRUMENTACAO') or request.endpoint == 'metrics':
+            return response
+
+        lenta, statement = g.get('query_mais_lenta', (0.0, None))
+        amostra = {
+            'total': time.perf_counter() - g.get('inicio_requisicao', time.perf_counter()),
+            'queries': queries,
+            'sql': g.get('sql_tempo', 0.0),
+            'query_mais_lenta': lenta,
+            'template': g.get('template_tempo', 0.0),
+            'bytes': response.calculate_content_length()
+        }
+        response.headers['Server-Timing'] = (
+            f'sql;dur={amostra["sql"] * 1000:.2f};desc="{queries} queries", '
+            f'tpl;dur={amostra["template"] * 1000:.2f}, '
+            f'app;dur={amostra["total"] * 1000:.2f}'
+        )
+        endpoint = request.endpoint or 'desconhecido'
+        self.metricas.registrar(endpoint, response.status_code, amostra)
+        current_app.logger.info(json.dumps({
+            'evento': 'requisicao',
+            'metodo': request.method,
+            'caminho': request.path,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'duracao_ms': round(amostra['total'] * 1000, 2),
+            'queries': queries,
+            'sql_ms': round(amostra['sql'] * 1000, 2),
+            'query_mais_lenta_ms': round(lenta * 1000, 2),
+            'query_mais_lenta': statement[:TAMANHO_MAX_STATEMENT] if statement else None,
+            'template_ms': round(amostra['template'] * 1000, 2),
+            'bytes': amostra['bytes']
+        }, ensure_ascii=False))
+        return response
+
+    def _exportar(self):
+        return Response(self.metricas.prometheus(), mimetype='text/plain; version=0.0.4')
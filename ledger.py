@@ -0,0 +1,915 @@
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from itertools import islice
+import numpy as np
+from sqlalchemy import (func, extract, select, insert, delete, literal, text, and_, or_, case, event, update,
+                        bindparam, type_coerce, BigInteger)
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db, cache_totais, registro_categorias
+from models import (ZERO, CENTAVO, Movimentacao, CategoriaDespesa, ResumoMensal, VersaoDados, Recorrencia,
+                    RecorrenciaOcorrencia, MovimentacaoArquivo, MODELOS)
+import importacao
+import busca
+import recorrencias
+import analise
+
+def insert_dialeto(model):
+    dialect = db.session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+    return insert(model)
+
+def atualizar_resumo_lote(linhas):
+    # Upsert incremental (executemany); não faz commit, fica na transação de quem chamou
+    stmt = insert_dialeto(ResumoMensal)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['ano', 'mes', 'tipo', 'categoria'],
+        set_={
+            'total': ResumoMensal.total + stmt.excluded.total,
+            'quantidade': ResumoMensal.quantidade + stmt.excluded.quantidade
+        }
+    ), linhas)
+
+def atualizar_resumo(tipo, movimentacao, sinal=1):
+    atualizar_resumo_lote([{
+        'ano': movimentacao.data.year,
+        'mes': movimentacao.data.month,
+        'tipo': tipo,
+        'categoria': movimentacao.detalhe,
+        'total': sinal * movimentacao.valor,
+        'quantidade': sinal
+    }])
+
+
+# Chave de cada tipo no dicionário de totais do dashboard
+CHAVES_TOTAIS = {
+    'ganho': 'ganhos',
+    'despesa': 'despesas',
+    'cartao': 'cartao',
+    'donativo': 'donativos'
+}
+
+def versao_atual():
+    return db.session.execute(select(VersaoDados.versao).where(VersaoDados.id == 1)).scalar() or 0
+
+def incrementar_versao():
+    return db.session.execute(
+        update(VersaoDados)
+        .where(VersaoDados.id == 1)
+        .values(versao=VersaoDados.versao + 1)
+        .returning(VersaoDados.versao)
+    ).scalar_one()
+
+def registrar_escrita(tipo, movimentacao, sinal=1):
+    # Atualiza rollup e versão na transação corrente; o cache só é tocado
+    # depois do commit (ver aplicar_deltas_totais)
+    atualizar_resumo(tipo, movimentacao, sinal)
+    versao = incrementar_versao()
+    db.session.info.setdefault('deltas_totais', []).append(
+        (versao, CHAVES_TOTAIS[tipo], sinal * movimentacao.valor))
+
+@event.listens_for(db.session, 'after_commit')
+def aplicar_deltas_totais(session):
+    for versao, chave, delta in session.info.pop('deltas_totais', []):
+        cache_totais.aplicar(versao, chave, delta)
+    for versao, nomes in session.info.pop('categorias_novas', []):
+        registro_categorias.adicionar(versao, nomes)
+
+@event.listens_for(db.session, 'after_rollback')
+def descartar_deltas_totais(session):
+    session.info.pop('deltas_totais', None)
+    session.info.pop('categorias_novas', None)
+
+# Linha de versao_dados com a versão das categorias de despesa
+VERSAO_CATEGORIAS = 2
+
+def versao_categorias():
+    return db.session.execute(
+        select(VersaoDados.versao).where(VersaoDados.id == VERSAO_CATEGORIAS)
+    ).scalar() or 0
+
+def _carregar_categorias():
+    return db.session.execute(
+        select(CategoriaDespesa.nome).where(CategoriaDespesa.ativo == True).order_by(CategoriaDespesa.nome)
+    ).scalars().all()
+
+def categorias_despesa():
+    # Nomes das categorias ativas, do registro em memória do worker
+    return registro_categorias.obter(versao_categorias, _carregar_categorias)
+
+def garantir_categorias(nomes):
+    # Cria (ou reativa) na transação corrente as categorias que o registro não
+    # conhece, com um único upsert; não faz commit. O registro só é atualizado
+    # depois do commit (ver aplicar_deltas_totais).
+    conhecidas = set(categorias_despesa())
+    novas = sorted({nome for nome in nomes if nome} - conhecidas)
+    if not novas:
+        return
+    stmt = insert_dialeto(CategoriaDespesa)
+    criadas = db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=['nome'],
+            set_={'ativo': True},
+            where=CategoriaDespesa.ativo == False
+        ).returning(CategoriaDespesa.nome),
+        [{'nome': nome, 'ativo': True} for nome in novas]
+    ).scalars().all()
+    if criadas:
+        stmt = insert_dialeto(VersaoDados).values(id=VERSAO_CATEGORIAS, versao=1)
+        versao = db.session.execute(
+            stmt.on_conflict_do_update(index_elements=['id'], set_={'versao': VersaoDados.versao + 1})
+            .returning(VersaoDados.versao)
+        ).scalar_one()
+        db.session.info.setdefault('categorias_novas', []).append((versao, criadas))
+
+def reconstruir_resumo():
+    db.session.execute(ResumoMensal.__table__.delete())
+    # Anos fechados que já foram para o arquivo continuam nos relatórios
+    for model in (Movimentacao, MovimentacaoArquivo):
+        ano = extract('year', model.data)
+        mes = extract('month', model.data)
+        db.session.execute(ResumoMensal.__table__.insert().from_select(
+            ['ano', 'mes', 'tipo', 'categoria', 'total', 'quantidade'],
+            select(ano, mes, model.tipo, model.detalhe, func.sum(model.valor), func.count())
+            .where(model.ativo == True)
+            .group_by(ano, mes, model.tipo, model.detalhe)
+        ))
+    db.session.commit()
+
+CATEGORIAS_PADRAO = ['Alimentação', 'Transporte', 'Moradia', 'Lazer', 'Saúde', 'Outros']
+
+def inicializar_banco():
+    # Idempotente: cria o schema, semeia categorias e o contador de versão com
+    # um INSERT ... ON CONFLICT DO NOTHING cada, e preenche o rollup se vazio
+    db.create_all()
+    db.session.execute(
+        insert_dialeto(CategoriaDespesa)
+        .values([{'nome': nome, 'ativo': True} for nome in CATEGORIAS_PADRAO])
+        .on_conflict_do_nothing(index_elements=['nome'])
+    )
+    db.session.execute(
+        insert_dialeto(VersaoDados)
+        .values([{'id': 1, 'versao': 0}, {'id': VERSAO_CATEGORIAS, 'versao': 0}])
+        .on_conflict_do_nothing(index_elements=['id'])
+    )
+    busca.criar_indice()
+    db.session.commit()
+    registro_categorias.invalidar()
+    if not db.session.query(ResumoMensal.query.exists()).scalar():
+        reconstruir_resumo()
+    if busca.vazio():
+        busca.reconstruir_indice()
+
+def campos_detalhe(tipo, detalhe):
+    # Detalhe e parcela já decomposta; fora do cartão a parcela é sempre 1/1
+    numero, total = importacao.parse_parcela(detalhe) if tipo == 'cartao' else (1, 1)
+    return {'detalhe': detalhe, 'parcela_numero': numero, 'parcela_total': total}
+
+IMPORTACAO_LOTE_PADRAO = 5000
+IMPORTACAO_MAX_ERROS = 1000
+
+def _gravar_lote(lote):
+    linhas = []
+    resumo = defaultdict(lambda: [0, 0])
+    categorias = set()
+    for mov in lote:
+        tipo = mov['tipo']
+        linhas.append({
+            'tipo': tipo,
+            'valor': mov['valor'],
+            'data': mov['data'],
+            'descricao': mov['descricao'],
+            'ativo': True,
+            **campos_detalhe(tipo, mov['detalhe'])
+        })
+        chave = (mov['data'].year, mov['data'].month, tipo, mov['detalhe'])
+        resumo[chave][0] += mov['valor']
+        resumo[chave][1] += 1
+        if tipo == 'despesa':
+            categorias.add(mov['detalhe'])
+
+    try:
+        garantir_categorias(categorias)
+        # Um só INSERT para todos os tipos
+        ids = db.session.execute(
+            insert(Movimentacao).returning(Movimentacao.id, sort_by_parameter_order=True), linhas
+        ).scalars().all()
+        busca.indexar([dict(linha, id=id) for id, linha in zip(ids, linhas)])
+        atualizar_resumo_lote([
+            {'ano': ano, 'mes': mes, 'tipo': tipo, 'categoria': categoria, 'total': total, 'quantidade': quantidade}
+            for (ano, mes, tipo, categoria), (total, quantidade) in resumo.items()
+        ])
+        # Um incremento por lote: o snapshot dos totais fica para trás e é recalculado
+        incrementar_versao()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(lote)
+
+def importar_movimentacoes(registros, tamanho_lote=IMPORTACAO_LOTE_PADRAO, progresso=None):
+    # registros: gerador de (número da linha, registro bruto) vindo de importacao.ler()
+    inicio = time.perf_counter()
+    importadas = 0
+    total_erros = 0
+    erros = []
+    lote = []
+    for numero, registro in registros:
+        try:
+            lote.append(importacao.normalizar(registro))
+        except ValueError as e:
+            total_erros += 1
+            if len(erros) < IMPORTACAO_MAX_ERROS:
+                erros.append((numero, str(e)))
+            continue
+        if len(lote) >= tamanho_lote:
+            importadas += _gravar_lote(lote)
+            lote = []
+            if progresso:
+                progresso(importadas, time.perf_counter() - inicio)
+    if lote:
+        importadas += _gravar_lote(lote)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'importadas': importadas,
+        'total_erros': total_erros,
+        'erros': erros,
+        'segundos': segundos,
+        'linhas_por_segundo': (importadas + total_erros) / segundos if segundos else 0
+    }
+
+def gravar_movimentacoes(movimentacoes, tamanho_lote=IMPORTACAO_LOTE_PADRAO, progresso=None):
+    # Como importar_movimentacoes, para dicts já normalizados (gerador sintético)
+    inicio = time.perf_counter()
+    gravadas = 0
+    movimentacoes = iter(movimentacoes)
+    while True:
+        lote = list(islice(movimentacoes, tamanho_lote))
+        if not lote:
+            break
+        gravadas += _gravar_lote(lote)
+        if progresso:
+            progresso(gravadas, time.perf_counter() - inicio)
+    return gravadas
+
+def criar_recorrencia(tipo, valor, detalhe, descricao, frequencia, dia, intervalo, data_inicio, data_fim=None):
+    recorrencias.validar(tipo, frequencia, dia, intervalo, data_inicio, data_fim)
+    if not detalhe:
+        raise ValueError('Informe a origem, categoria ou instituição')
+    if valor <= 0:
+        raise ValueError('Valor deve ser positivo')
+    recorrencia = Recorrencia(tipo=tipo, valor=valor, detalhe=detalhe[:importacao.LIMITE_DETALHE[tipo]], descricao=descricao, frequencia=frequencia,
+                              dia=dia, intervalo=intervalo, data_inicio=data_inicio, data_fim=data_fim, ativo=True)
+    db.session.add(recorrencia)
+    return recorrencia
+
+def materializar_recorrencias(ate=None, tamanho_lote=IMPORTACAO_LOTE_PADRAO):
+    # Gera as ocorrências devidas de todas as regras até `ate` em lotes. Cada lote
+    # reivindica suas chaves (recorrencia_id, data) com ON CONFLICT DO NOTHING na
+    # mesma transação dos INSERTs, então reexecuções e workers concorrentes nunca
+    # duplicam lançamentos.
+    ate = ate or date.today()
+    regras = db.session.execute(select(Recorrencia).where(
+        Recorrencia.ativo == True,
+        or_(Recorrencia.gerada_ate == None, Recorrencia.gerada_ate < ate)
+    )).scalars().all()
+    if not regras:
+        return 0
+    # Copiados antes do primeiro commit, que expira os objetos
+    pendentes = [
+        {'recorrencia_id': regra.id, 'tipo': regra.tipo, 'valor': regra.valor, 'data': data,
+         'descricao': regra.descricao or '', 'detalhe': regra.detalhe}
+        for regra in regras
+        for data in recorrencias.ocorrencias(regra, ate)
+    ]
+    ids = [regra.id for regra in regras]
+
+    geradas = 0
+    for inicio in range(0, len(pendentes), tamanho_lote):
+        lote = pendentes[inicio:inicio + tamanho_lote]
+        reivindicadas = set(db.session.execute(
+            insert_dialeto(RecorrenciaOcorrencia)
+            .on_conflict_do_nothing()
+            .returning(RecorrenciaOcorrencia.recorrencia_id, RecorrenciaOcorrencia.data),
+            [{'recorrencia_id': o['recorrencia_id'], 'data': o['data']} for o in lote]
+        ).tuples())
+        novas = [o for o in lote if (o['recorrencia_id'], o['data']) in reivindicadas]
+        if novas:
+            geradas += _gravar_lote(novas)
+        else:
+            db.session.commit()
+
+    db.session.execute(update(Recorrencia).where(Recorrencia.id.in_(ids)).values(gerada_ate=ate))
+    db.session.commit()
+    return geradas
+
+# Valores aceitos no filtro de tipo do extrato
+FILTRO_TIPOS = {
+    'todos': list(MODELOS),
+    'ganhos': ['ganho'],
+    'despesas': ['despesa'],
+    'cartao': ['cartao'],
+    'donativos': ['donativo']
+}
+
+EXTRATO_LIMITE_PADRAO = 50
+EXTRATO_LIMITE_MAXIMO = 200
+
+def codificar_cursor(mov):
+    return f'{mov.data.isoformat()}:{mov.id}'
+
+def decodificar_cursor(cursor):
+    try:
+        data, id = cursor.split(':')
+        return datetime.strptime(data, '%Y-%m-%d').date(), int(id)
+    except ValueError:
+        raise ValueError(f'Cursor inválido: {cursor}')
+
+def _predicado_cursor(cursor):
+    # Ordem: data desc, id desc (coberta por ix_movimentacao_ativo_data_id)
+    data, id = cursor
+    return or_(Movimentacao.data < data, and_(Movimentacao.data == data, Movimentacao.id < id))
+
+def select_movimentacoes():
+    return select(
+        Movimentacao.tipo,
+        Movimentacao.id,
+        Movimentacao.data,
+        Movimentacao.valor,
+        Movimentacao.descricao,
+        Movimentacao.detalhe
+    )
+
+def consultar_totais():
+    # Um único SELECT sobre o resumo_mensal (pequeno e já inclui anos arquivados),
+    # com SUM condicional por tipo. A versão vem no mesmo SELECT para que totais
+    # e versão sejam do mesmo snapshot.
+    linha = db.session.execute(select(
+        *[
+            func.coalesce(func.sum(case((ResumoMensal.tipo == tipo, ResumoMensal.total), else_=0)), 0).label(tipo)
+            for tipo in MODELOS
+        ],
+        select(VersaoDados.versao).where(VersaoDados.id == 1).scalar_subquery().label('versao')
+    )).one()
+    totais = {
+        'ganhos': linha.ganho,
+        'despesas': linha.despesa,
+        'cartao': linha.cartao,
+        'donativos': linha.donativo
+    }
+    totais['saldo'] = totais['ganhos'] - totais['despesas'] - totais['cartao'] - totais['donativos']
+    return totais, linha.versao or 0
+
+def totais_dashboard():
+    totais = cache_totais.obter(versao_atual())
+    if totais is None:
+        totais, versao = consultar_totais()
+        cache_totais.definir(versao, totais)
+    return totais
+
+def ultimas_movimentacoes(n=5):
+    movimentacoes, _ = consultar_extrato(list(MODELOS), limite=n)
+    return movimentacoes
+
+def select_extrato(tipos, data_inicio=None, data_fim=None, categoria=None,
+                   valor_min=None, valor_max=None, cursor=None, limite=None):
+    # Uma query indexada em data/id para qualquer combinação de tipos; com
+    # limite e cursor o custo da página não cresce com o histórico.
+    if not tipos:
+        return None
+    filtros = [Movimentacao.ativo == True]
+    if set(tipos) != set(MODELOS):
+        filtros.append(Movimentacao.tipo.in_(tipos))
+    if data_inicio:
+        filtros.append(Movimentacao.data >= data_inicio)
+    if data_fim:
+        # Intervalo semiaberto: [data_inicio, data_fim + 1 dia)
+        filtros.append(Movimentacao.data < data_fim + timedelta(days=1))
+    if categoria:
+        filtros.append(Movimentacao.detalhe == categoria)
+    if valor_min is not None:
+        filtros.append(Movimentacao.valor >= valor_min)
+    if valor_max is not None:
+        filtros.append(Movimentacao.valor <= valor_max)
+    if cursor:
+        filtros.append(_predicado_cursor(cursor))
+    stmt = select_movimentacoes().where(*filtros).order_by(Movimentacao.data.desc(), Movimentacao.id.desc())
+    return stmt.limit(limite) if limite is not None else stmt
+
+def consultar_extrato(tipos, limite=EXTRATO_LIMITE_PADRAO, **filtros):
+    stmt = select_extrato(tipos, limite=limite + 1, **filtros)
+    if stmt is None:
+        return [], None
+    movimentacoes = db.session.execute(stmt).all()
+
+    proximo_cursor = None
+    if len(movimentacoes) > limite:
+        movimentacoes = movimentacoes[:limite]
+        proximo_cursor = codificar_cursor(movimentacoes[-1])
+    return movimentacoes, proximo_cursor
+
+def criar_movimentacao(tipo, valor, data, descricao, detalhe):
+    model = MODELOS.get(tipo)
+    if not model:
+        raise KeyError('tipo')
+    if tipo == 'despesa':
+        garantir_categorias([detalhe])
+    movimentacao = model(valor=valor, data=data, descricao=descricao, ativo=True,
+                         **campos_detalhe(tipo, detalhe))
+    db.session.add(movimentacao)
+    registrar_escrita(tipo, movimentacao)
+    db.session.flush()
+    busca.indexar([{'tipo': tipo, 'id': movimentacao.id, 'data': data, 'descricao': descricao, 'detalhe': detalhe}])
+    return movimentacao
+
+def excluir_registro(tipo, id):
+    # Soft delete; devolve None se o registro não existe (ou é de outro tipo)
+    registro = db.session.get(MODELOS[tipo], id)
+    if registro and registro.ativo:
+        registro.ativo = False
+        registrar_escrita(tipo, registro, sinal=-1)
+        busca.remover(tipo, [id])
+    return registro
+
+def _campos_arquivados(arquivada):
+    return {'detalhe': arquivada.detalhe, 'parcela_numero': arquivada.parcela_numero or 1,
+            'parcela_total': arquivada.parcela_total or 1}
+
+def restaurar_registro(tipo, id):
+    # Desfaz o soft delete, trazendo a linha de volta do arquivo se ela já saiu
+    # da tabela quente; devolve None se o registro não existe em nenhum dos dois.
+    # O arquivo é consultado primeiro: em bancos anteriores ao AUTOINCREMENT o
+    # id arquivado pode ter sido reaproveitado por outra linha da tabela quente.
+    model = MODELOS[tipo]
+    arquivada = db.session.get(MovimentacaoArquivo, (tipo, id))
+    if arquivada is None:
+        registro = db.session.get(model, id)
+        if registro is None:
+            return None
+    else:
+        if db.session.get(Movimentacao, id) is not None:
+            raise ValueError(f'O id {id} já pertence a outra movimentação; a arquivada não pode ser restaurada')
+        registro = model(id=id, valor=arquivada.valor, data=arquivada.data, descricao=arquivada.descricao,
+                         ativo=arquivada.ativo, **_campos_arquivados(arquivada))
+        db.session.delete(arquivada)
+        db.session.add(registro)
+        if registro.ativo:
+            # Linha de ano arquivado: já está no resumo, só volta ao extrato
+            busca.indexar([{'tipo': tipo, 'id': id, 'data': registro.data, 'descricao': registro.descricao,
+                            'detalhe': registro.detalhe}])
+            incrementar_versao()
+    if not registro.ativo:
+        registro.ativo = True
+        registrar_escrita(tipo, registro)
+        busca.indexar([{'tipo': tipo, 'id': id, 'data': registro.data, 'descricao': registro.descricao,
+                        'detalhe': registro.detalhe}])
+    return registro
+
+OPERACOES = ('excluir', 'restaurar', 'recategorizar', 'editar')
+OPERACOES_LOTE_MAXIMO = 1000
+
+def _normalizar_operacao(item):
+    # Levanta ValueError para que o item seja recusado sem derrubar o lote
+    tipo, operacao = item.get('tipo'), item.get('operacao')
+    if tipo not in MODELOS:
+        raise ValueError(f'Tipo inválido: {tipo}')
+    if operacao not in OPERACOES:
+        raise ValueError(f'Operação inválida: {operacao}')
+    try:
+        id = int(item.get('id'))
+    except (TypeError, ValueError):
+        raise ValueError(f"id inválido: {item.get('id')!r}")
+    valores = {}
+    if operacao == 'recategorizar':
+        detalhe = str(item.get('detalhe') or '').strip()
+        if not detalhe:
+            raise ValueError('Informe o novo detalhe')
+        valores['detalhe'] = detalhe[:importacao.LIMITE_DETALHE[tipo]]
+    elif operacao == 'editar':
+        if item.get('valor') not in (None, ''):
+            valor = importacao.parse_valor(str(item['valor'])).quantize(CENTAVO, ROUND_HALF_UP)
+            if valor <= 0:
+                raise ValueError('Valor deve ser positivo')
+            valores['valor'] = valor
+        if item.get('data'):
+            valores['data'] = importacao.parse_data(str(item['data']))
+        if not valores:
+            raise ValueError('Informe o novo valor e/ou data')
+    return tipo, id, operacao, valores
+
+def _somar_resumo(resumo, tipo, valor, data, detalhe, sinal):
+    chave = (data.year, data.month, tipo, detalhe)
+    resumo[chave][0] += sinal * valor
+    resumo[chave][1] += sinal
+
+def aplicar_operacoes(itens):
+    # Operações do extrato em lote, numa única transação (não faz commit).
+    # Itens que gravam os mesmos campos viram um só UPDATE ... WHERE id IN;
+    # o rollup recebe os deltas (estado antigo sai, novo entra) num só upsert.
+    # Devolve um resultado por item, na ordem recebida.
+    resultados = []
+    validos = {}
+    for item in itens:
+        resultado = {'tipo': item.get('tipo'), 'id': item.get('id'), 'operacao': item.get('operacao')}
+        resultados.append(resultado)
+        try:
+            tipo, id, operacao, valores = _normalizar_operacao(item)
+        except ValueError as e:
+            resultado.update(status='erro', mensagem=str(e))
+            continue
+        if (tipo, id) in validos:
+            resultado.update(status='erro', mensagem='Movimentação repetida no lote')
+            continue
+        validos[(tipo, id)] = (operacao, valores, resultado)
+
+    # Estado atual das linhas envolvidas num único SELECT, e quais das
+    # restaurações vêm do arquivo
+    atuais = {}
+    arquivadas = set()
+    if validos:
+        atuais = {(linha.tipo, linha.id): linha for linha in db.session.execute(
+            select_movimentacoes().add_columns(Movimentacao.ativo)
+            .where(Movimentacao.id.in_([id for _, id in validos]))
+        )}
+        restauracoes = [id for (_, id), (operacao, _, _) in validos.items() if operacao == 'restaurar']
+        if restauracoes:
+            arquivadas = set(db.session.execute(
+                select(MovimentacaoArquivo.tipo, MovimentacaoArquivo.id)
+                .where(MovimentacaoArquivo.id.in_(restauracoes))
+            ).tuples())
+
+    grupos = defaultdict(list)
+    resumo = defaultdict(lambda: [0, 0])
+    reindexar = []
+    desindexar = defaultdict(list)
+    categorias = set()
+    for (tipo, id), (operacao, valores, resultado) in validos.items():
+        atual = atuais.get((tipo, id))
+        if operacao == 'restaurar' and (tipo, id) in arquivadas:
+            # Excluída e já arquivada: volta pela restauração individual
+            try:
+                restaurar_registro(tipo, id)
+                resultado['status'] = 'ok'
+            except ValueError as e:
+                resultado.update(status='erro', mensagem=str(e))
+            continue
+        if atual is None:
+            resultado.update(status='erro', mensagem='Registro não encontrado')
+            continue
+        if atual.ativo == (operacao == 'restaurar'):
+            resultado.update(status='erro', mensagem='Registro já está ativo' if atual.ativo else 'Registro excluído')
+            continue
+        novo = {'valor': atual.valor, 'data': atual.data, 'detalhe': atual.detalhe, **valores}
+        if atual.ativo:
+            _somar_resumo(resumo, tipo, atual.valor, atual.data, atual.detalhe, -1)
+        if operacao == 'excluir':
+            desindexar[tipo].append(id)
+        else:
+            _somar_resumo(resumo, tipo, novo['valor'], novo['data'], novo['detalhe'], 1)
+            reindexar.append({'tipo': tipo, 'id': id, 'data': novo['data'], 'descricao': atual.descricao,
+                              'detalhe': novo['detalhe']})
+        if tipo == 'despesa' and 'detalhe' in valores:
+            categorias.add(valores['detalhe'])
+        campos = dict(valores)
+        if 'detalhe' in campos:
+            campos.update(campos_detalhe(tipo, campos.pop('detalhe')))
+        if operacao in ('excluir', 'restaurar'):
+            campos['ativo'] = operacao == 'restaurar'
+        grupos[tuple(sorted(campos.items()))].append(id)
+        resultado['status'] = 'ok'
+
+    if not grupos:
+        return resultados
+    garantir_categorias(categorias)
+    for campos, lista in grupos.items():
+        db.session.execute(
+            update(Movimentacao).where(Movimentacao.id.in_(lista)).values(**dict(campos))
+            .execution_options(synchronize_session=False)
+        )
+    atualizar_resumo_lote([
+        {'ano': ano, 'mes': mes, 'tipo': tipo, 'categoria': categoria, 'total': total, 'quantidade': quantidade}
+        for (ano, mes, tipo, categoria), (total, quantidade) in resumo.items()
+        if total or quantidade
+    ])
+    for tipo, lista in desindexar.items():
+        busca.remover(tipo, lista)
+    busca.indexar(reindexar)
+    incrementar_versao()
+    return resultados
+
+ARQUIVO_LOTE_PADRAO = 5000
+
+COLUNAS_ARQUIVO = ['tipo', 'id', 'valor', 'data', 'detalhe', 'descricao', 'parcela_numero', 'parcela_total',
+                   'ativo', 'arquivado_em']
+
+def _arquivar_lote(condicao, tamanho_lote, agora):
+    # Um lote por transação: copia para o arquivo com INSERT ... SELECT e apaga
+    # da tabela quente. O resumo_mensal não muda; a versão sobe porque o extrato muda
+    chaves = db.session.execute(
+        select(Movimentacao.tipo, Movimentacao.id).where(condicao).order_by(Movimentacao.id).limit(tamanho_lote)
+    ).all()
+    if not chaves:
+        return 0
+    ids = [id for _, id in chaves]
+    try:
+        db.session.execute(insert(MovimentacaoArquivo).from_select(COLUNAS_ARQUIVO, select(
+            Movimentacao.tipo, Movimentacao.id, Movimentacao.valor, Movimentacao.data, Movimentacao.detalhe,
+            Movimentacao.descricao, Movimentacao.parcela_numero, Movimentacao.parcela_total,
+            Movimentacao.ativo, literal(agora)
+        ).where(Movimentacao.id.in_(ids))))
+        db.session.execute(delete(Movimentacao).where(Movimentacao.id.in_(ids)))
+        por_tipo = defaultdict(list)
+        for tipo, id in chaves:
+            por_tipo[tipo].append(id)
+        for tipo, lista in por_tipo.items():
+            busca.remover(tipo, lista)
+        incrementar_versao()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(ids)
+
+def _arquivar(condicao, tamanho_lote):
+    agora = datetime.now()
+    arquivadas = 0
+    while True:
+        movidas = _arquivar_lote(condicao, tamanho_lote, agora)
+        arquivadas += movidas
+        if movidas < tamanho_lote:
+            return arquivadas
+
+def _intervalo_ano(coluna, ano):
+    return and_(coluna >= date(ano, 1, 1), coluna < date(ano + 1, 1, 1))
+
+def arquivar_inativos(tamanho_lote=ARQUIVO_LOTE_PADRAO):
+    return _arquivar(Movimentacao.ativo == False, tamanho_lote)
+
+def arquivar_ano(ano, tamanho_lote=ARQUIVO_LOTE_PADRAO):
+    # Só anos fechados: o ano corrente ainda recebe lançamentos e edições
+    if ano >= date.today().year:
+        raise ValueError(f'{ano} não é um ano fechado')
+    return _arquivar(_intervalo_ano(Movimentacao.data, ano), tamanho_lote)
+
+def restaurar_ano(ano, tamanho_lote=ARQUIVO_LOTE_PADRAO):
+    # Devolve as movimentações ativas do ano à tabela quente com os ids
+    # originais; as excluídas ficam no arquivo
+    restauradas = 0
+    while True:
+        lote = db.session.execute(
+            select(MovimentacaoArquivo)
+            .where(MovimentacaoArquivo.ativo == True, _intervalo_ano(MovimentacaoArquivo.data, ano))
+            .order_by(MovimentacaoArquivo.id)
+            .limit(tamanho_lote)
+        ).scalars().all()
+        if not lote:
+            return restauradas
+        try:
+            db.session.execute(insert(Movimentacao), [
+                {'id': arq.id, 'tipo': arq.tipo, 'valor': arq.valor, 'data': arq.data, 'descricao': arq.descricao,
+                 'ativo': True, **_campos_arquivados(arq)}
+                for arq in lote
+            ])
+            db.session.execute(delete(MovimentacaoArquivo).where(
+                MovimentacaoArquivo.id.in_([arq.id for arq in lote])))
+            busca.indexar([
+                {'tipo': arq.tipo, 'id': arq.id, 'data': arq.data, 'descricao': arq.descricao, 'detalhe': arq.detalhe}
+                for arq in lote
+            ])
+            incrementar_versao()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        restauradas += len(lote)
+        if len(lote) < tamanho_lote:
+            return restauradas
+
+def compactar():
+    # Devolve ao sistema o espaço das linhas apagadas e atualiza as estatísticas
+    # do planejador. VACUUM não roda dentro de transação, daí o AUTOCOMMIT
+    db.session.commit()
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conexao:
+        if conexao.dialect.name == 'postgresql':
+            for model in (Movimentacao, MovimentacaoArquivo):
+                conexao.execute(text(f'VACUUM ANALYZE {model.__tablename__}'))
+        else:
+            conexao.execute(text('VACUUM'))
+            conexao.execute(text('ANALYZE'))
+
+def consultar_busca(consulta, tipos=None, data_inicio=None, data_fim=None, pagina=1,
+                    limite=busca.BUSCA_LIMITE_PADRAO):
+    # Busca no índice textual e carrega as linhas da página com um SELECT por
+    # id, preservando a ordem de relevância
+    chaves, tem_proxima = busca.buscar(consulta, tipos, data_inicio, data_fim, pagina, limite)
+    if not chaves:
+        return [], tem_proxima
+    linhas = {(linha.tipo, linha.id): linha for linha in db.session.execute(
+        select_movimentacoes().where(Movimentacao.id.in_([id for _, id in chaves]))
+    )}
+    return [linhas[chave] for chave in chaves if chave in linhas], tem_proxima
+
+def calcular_saldo(valores):
+    return valores['ganho'] - valores['despesa'] - valores['cartao'] - valores['donativo']
+
+def consultar_relatorio_mensal(ano, mes):
+    totais = dict.fromkeys(MODELOS, ZERO)
+    totais.update(db.session.query(ResumoMensal.tipo, func.sum(ResumoMensal.total))
+        .filter(ResumoMensal.ano == ano, ResumoMensal.mes == mes)
+        .group_by(ResumoMensal.tipo)
+        .all())
+    totais['saldo'] = calcular_saldo(totais)
+    return totais
+
+RELATORIO_ANUAL_MAX_ANOS = 10
+
+def consultar_relatorio_anual(anos):
+    # Matriz densa 12 x tipos por ano, montada com uma única query no rollup
+    # para todos os anos pedidos
+    matriz = {ano: [dict.fromkeys(MODELOS, ZERO) for _ in range(12)] for ano in anos}
+    for linha in db.session.query(
+        ResumoMensal.ano,
+        ResumoMensal.mes,
+        ResumoMensal.tipo,
+        func.sum(ResumoMensal.total).label('total')
+    ).filter(
+        ResumoMensal.ano.in_(anos)
+    ).group_by(ResumoMensal.ano, ResumoMensal.mes, ResumoMensal.tipo).all():
+        matriz[linha.ano][linha.mes - 1][linha.tipo] = linha.total
+
+    relatorio = []
+    for ano in anos:
+        meses = [dict(valores, mes=mes, saldo=calcular_saldo(valores))
+                 for mes, valores in enumerate(matriz[ano], start=1)]
+        totais = {tipo: sum(m[tipo] for m in meses) for tipo in MODELOS}
+        totais['saldo'] = calcular_saldo(totais)
+        relatorio.append({'ano': ano, 'meses': meses, 'totais': totais})
+    return relatorio
+
+
+ANALISE_MESES_PADRAO = 12
+ANALISE_MESES_MAXIMO = 36
+
+def _centavos(valor):
+    return Decimal(int(round(valor))) * CENTAVO
+
+def consultar_analise_categorias(meses=ANALISE_MESES_PADRAO, fim=None):
+    # Gasto mensal por categoria de despesa nos últimos `meses` meses, com
+    # orçamento, médias móveis e anomalias. Lê do rollup (uma linha por
+    # mês/categoria, não por lançamento) como colunas de inteiros e faz as
+    # contas em NumPy; os 12 meses anteriores à janela entram só como
+    # histórico das médias e do z-score.
+    fim = (fim or datetime.now().date()).replace(day=1)
+    ultimo = fim.year * 12 + fim.month - 1
+    primeiro = ultimo - meses + 1
+    inicio = primeiro - analise.JANELAS[-1]
+    indice = ResumoMensal.ano * 12 + ResumoMensal.mes - 1
+    colunas = db.session.execute(
+        select(
+            indice - inicio,
+            ResumoMensal.categoria,
+            type_coerce(ResumoMensal.total, BigInteger)
+        ).where(
+            ResumoMensal.tipo == 'despesa',
+            ResumoMensal.quantidade > 0,
+            ResumoMensal.ano.between(inicio // 12, ultimo // 12),
+            indice.between(inicio, ultimo)
+        )
+    ).all()
+    orcamentos = dict(db.session.execute(
+        select(CategoriaDespesa.nome, type_coerce(CategoriaDespesa.orcamento, BigInteger))
+        .where(CategoriaDespesa.orcamento != None)
+    ).all())
+    # Categorias com orçamento e sem gasto aparecem zeradas
+    colunas += [(0, nome, 0) for nome in orcamentos]
+    if not colunas:
+        return {'meses': [], 'categorias': []}
+    posicoes, nomes, totais = zip(*colunas)
+    categorias, matriz = analise.matriz_mensal(posicoes, nomes, totais, ultimo - inicio + 1)
+    resultado = analise.analisar(matriz, [orcamentos.get(nome, float('nan')) for nome in categorias])
+
+    janela = slice(primeiro - inicio, None)
+    no_periodo = matriz[:, janela]
+    meses_periodo = [{'ano': i // 12, 'mes': i % 12 + 1} for i in range(primeiro, ultimo + 1)]
+    relatorio = []
+    for linha in np.argsort(-no_periodo.sum(axis=1), kind='stable'):
+        nome = categorias[linha]
+        if not no_periodo[linha].any() and nome not in orcamentos:
+            continue
+        orcamento = orcamentos.get(nome)
+        detalhe = []
+        for coluna, mes in enumerate(meses_periodo, start=primeiro - inicio):
+            z = resultado['zscore'][linha, coluna]
+            detalhe.append(dict(
+                mes,
+                total=_centavos(matriz[linha, coluna]),
+                **{f'media_{n}': _centavos(resultado['medias'][n][linha, coluna]) for n in analise.JANELAS},
+                zscore=None if np.isnan(z) else round(float(z), 2),
+                anomalia=bool(resultado['anomalia'][linha, coluna]),
+                diferenca_orcamento=None if orcamento is None else _centavos(resultado['diferenca'][linha, coluna])
+            ))
+        relatorio.append({
+            'nome': nome,
+            'orcamento': None if orcamento is None else _centavos(orcamento),
+            'total': _centavos(no_periodo[linha].sum()),
+            'media_mensal': _centavos(no_periodo[linha].mean()),
+            'meses_acima_orcamento': 0 if orcamento is None else int((no_periodo[linha] > orcamento).sum()),
+            'anomalias': int(resultado['anomalia'][linha, janela].sum()),
+            'meses': detalhe
+        })
+    return {'meses': meses_periodo, 'categorias': relatorio}
+
+def definir_orcamentos(orcamentos):
+    # {nome: Decimal ou None}; None remove o orçamento. Não faz commit.
+    if orcamentos:
+        tabela = CategoriaDespesa.__table__
+        db.session.execute(
+            tabela.update().where(tabela.c.nome == bindparam('b_nome'))
+            .values(orcamento=bindparam('b_orcamento')),
+            [{'b_nome': nome, 'b_orcamento': valor} for nome, valor in orcamentos.items()]
+        )
+
+
+PROJECAO_MESES_PADRAO = 12
+PROJECAO_MESES_MAXIMO = 36
+
+def _indice_mes(coluna_data):
+    # Meses desde o ano 0: permite somar deslocamentos de mês em SQL
+    return extract('year', coluna_data) * 12 + extract('month', coluna_data) - 1
+
+def _data_do_indice(indice):
+    return date(indice // 12, indice % 12 + 1, 1)
+
+def consultar_projecao_cartao(meses=PROJECAO_MESES_PADRAO, inicio=None):
+    # Fatura dos próximos `meses` meses numa única query: cada compra parcelada
+    # k/n é expandida (join com uma sequência 0..PARCELAS_MAX via CTE recursiva)
+    # nas parcelas k+1..n, uma por mês a partir do mês da compra. O deslocamento
+    # 0 é a própria parcela lançada.
+    inicio = (inicio or datetime.now().date()).replace(day=1)
+    primeiro = inicio.year * 12 + inicio.month - 1
+    ultimo = primeiro + meses - 1
+
+    deslocamentos = select(literal(0).label('k')).cte('deslocamentos', recursive=True)
+    deslocamentos = deslocamentos.union_all(
+        select(deslocamentos.c.k + 1).where(deslocamentos.c.k < importacao.PARCELAS_MAX)
+    )
+
+    model = MODELOS['cartao']
+    # Índice do mês calculado uma vez por compra: MATERIALIZED impede o SQLite
+    # de achatar a CTE e recalcular strftime para cada par (compra, deslocamento).
+    # Só entram compras que ainda podem ter parcela na janela (ix_movimentacao_ativo_tipo_data).
+    # Uma compra parcelada de um ano já arquivado continua gerando parcelas
+    # futuras: as ativas do arquivo entram também (ix_movimentacao_arquivo_data).
+    compras = select(
+        model.valor,
+        _indice_mes(model.data).label('origem'),
+        (model.parcela_total - model.parcela_numero).label('restantes')
+    ).where(
+        model.ativo == True,
+        model.data >= _data_do_indice(primeiro - importacao.PARCELAS_MAX),
+        model.data < _data_do_indice(ultimo + 1)
+    ).union_all(select(
+        MovimentacaoArquivo.valor,
+        _indice_mes(MovimentacaoArquivo.data),
+        func.coalesce(MovimentacaoArquivo.parcela_total, 1) - func.coalesce(MovimentacaoArquivo.parcela_numero, 1)
+    ).where(
+        MovimentacaoArquivo.tipo == 'cartao',
+        MovimentacaoArquivo.ativo == True,
+        MovimentacaoArquivo.data >= _data_do_indice(primeiro - importacao.PARCELAS_MAX),
+        MovimentacaoArquivo.data < _data_do_indice(ultimo + 1)
+    )).cte('compras').prefix_with('MATERIALIZED')
+    k = deslocamentos.c.k
+    mes = (compras.c.origem + k).label('mes')
+    linhas = db.session.execute(
+        select(
+            mes,
+            func.sum(case((k == 0, compras.c.valor), else_=literal(0, model.valor.type))).label('lancado'),
+            func.sum(case((k > 0, compras.c.valor), else_=literal(0, model.valor.type))).label('projetado'),
+            func.count().label('parcelas')
+        )
+        .select_from(compras)
+        .join(deslocamentos, and_(
+            k <= compras.c.restantes,
+            k >= primeiro - compras.c.origem,
+            k <= ultimo - compras.c.origem
+        ))
+        .group_by(mes)
+    ).all()
+
+    por_mes = {linha.mes: linha for linha in linhas}
+    projecao = []
+    for indice in range(primeiro, ultimo + 1):
+        linha = por_mes.get(indice)
+        lancado = linha.lancado if linha else ZERO
+        projetado = linha.projetado if linha else ZERO
+        projecao.append({
+            'ano': indice // 12,
+            'mes': indice % 12 + 1,
+            'lancado': lancado,
+            'projetado': projetado,
+            'total': lancado + projetado,
+            'parcelas': linha.parcelas if linha else 0
+        })
+    return projecao
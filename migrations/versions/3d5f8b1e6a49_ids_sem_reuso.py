@@ -0,0 +1,48 @@
+"""Ids de movimentação nunca reaproveitados (inclusive os arquivados)
+
+Revision ID: 3d5f8b1e6a49
+Revises: 9e4a7c2b1f58
+Create Date: 2026-10-19 10:02:37.581130
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d5f8b1e6a49'
+down_revision = '9e4a7c2b1f58'
+branch_labels = None
+depends_on = None
+
+MAIOR_ID = ('SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM movimentacao '
+            'UNION ALL SELECT MAX(id) FROM movimentacao_arquivo) AS ids')
+
+
+def upgrade():
+    conexao = op.get_bind()
+    if conexao.dialect.name == 'postgresql':
+        # A sequência nunca volta, mas foi ajustada só pelos ids da tabela
+        # quente em c7d1f4a8e239: passa também dos arquivados
+        conexao.execute(sa.text(
+            f"SELECT setval(pg_get_serial_sequence('movimentacao', 'id'), "
+            f"GREATEST(COALESCE(({MAIOR_ID}), 0) + 1, nextval(pg_get_serial_sequence('movimentacao', 'id'))), false)"
+        ))
+        return
+
+    # SQLite: recria a tabela com AUTOINCREMENT (os índices vêm junto) e
+    # começa a sequência depois do maior id já usado, arquivado ou não
+    with op.batch_alter_table('movimentacao', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}):
+        pass
+    maior = conexao.execute(sa.text(MAIOR_ID)).scalar() or 0
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'movimentacao'")
+    op.execute(f"INSERT INTO sqlite_sequence (name, seq) VALUES ('movimentacao', {maior})")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        return
+    with op.batch_alter_table('movimentacao', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}):
+        pass
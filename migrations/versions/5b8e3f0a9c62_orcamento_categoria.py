@@ -0,0 +1,26 @@
+"""Orçamento mensal por categoria de despesa
+
+Revision ID: 5b8e3f0a9c62
+Revises: c7d1f4a8e239
+Create Date: 2026-10-18 23:40:12.318604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e3f0a9c62'
+down_revision = 'c7d1f4a8e239'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('categoria_despesa', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('orcamento', sa.BigInteger(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('categoria_despesa', schema=None) as batch_op:
+        batch_op.drop_column('orcamento')
@@ -0,0 +1,37 @@
+"""Índices compostos (ativo, data) e (ativo, categoria, data)
+
+Revision ID: 7c2e9a4b5d13
+Revises: 41f36ffa1b32
+Create Date: 2026-10-18 10:12:40.118204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2e9a4b5d13'
+down_revision = '41f36ffa1b32'
+branch_labels = None
+depends_on = None
+
+# tabela -> coluna de categoria/origem
+TABELAS = {
+    'ganho': 'origem',
+    'despesa': 'categoria',
+    'cartao_credito': 'parcela',
+    'donativo': 'instituicao',
+}
+
+
+def upgrade():
+    for tabela, coluna in TABELAS.items():
+        op.create_index(f'ix_{tabela}_ativo_data', tabela, ['ativo', 'data'],
+                        unique=False, if_not_exists=True)
+        op.create_index(f'ix_{tabela}_ativo_{coluna}_data', tabela, ['ativo', coluna, 'data'],
+                        unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for tabela, coluna in TABELAS.items():
+        op.drop_index(f'ix_{tabela}_ativo_{coluna}_data', table_name=tabela, if_exists=True)
+        op.drop_index(f'ix_{tabela}_ativo_data', table_name=tabela, if_exists=True)
@@ -0,0 +1,72 @@
+"""resumo_mensal e versao_dados para bancos que só passaram por migrações
+
+Revision ID: 9e4a7c2b1f58
+Revises: 5b8e3f0a9c62
+Create Date: 2026-10-19 09:14:52.407316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4a7c2b1f58'
+down_revision = '5b8e3f0a9c62'
+branch_labels = None
+depends_on = None
+
+# Linhas de versao_dados: 1 = dados (ETag/cache de totais), 2 = categorias
+VERSOES = (1, 2)
+
+
+def upgrade():
+    # As duas tabelas nasceram com db.create_all() no boot e nunca tiveram
+    # migração; quem passou por `flask init-db` já as tem, então tudo aqui é
+    # condicional e idempotente
+    conexao = op.get_bind()
+    tabelas = sa.inspect(conexao).get_table_names()
+    if 'resumo_mensal' not in tabelas:
+        op.create_table('resumo_mensal',
+            sa.Column('ano', sa.Integer(), nullable=False),
+            sa.Column('mes', sa.Integer(), nullable=False),
+            sa.Column('tipo', sa.String(length=20), nullable=False),
+            sa.Column('categoria', sa.String(length=100), nullable=False),
+            sa.Column('total', sa.BigInteger(), nullable=False),
+            sa.Column('quantidade', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('ano', 'mes', 'tipo', 'categoria')
+        )
+    if 'versao_dados' not in tabelas:
+        op.create_table('versao_dados',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('versao', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+    for id in VERSOES:
+        op.execute(
+            f'INSERT INTO versao_dados (id, versao) SELECT {id}, 0 '
+            f'WHERE NOT EXISTS (SELECT 1 FROM versao_dados WHERE id = {id})'
+        )
+
+    # Rollup vazio (tabela nova, ou esvaziada por b81f0d6c3e27): reconstrói a
+    # partir das movimentações ativas, inclusive as dos anos arquivados
+    if conexao.execute(sa.text('SELECT COUNT(*) FROM resumo_mensal')).scalar():
+        return
+    resumo = sa.table('resumo_mensal', *(sa.column(nome) for nome in
+                                         ('ano', 'mes', 'tipo', 'categoria', 'total', 'quantidade')))
+    for tabela in ('movimentacao', 'movimentacao_arquivo'):
+        origem = sa.table(tabela, sa.column('tipo'), sa.column('valor'), sa.column('data', sa.Date()),
+                          sa.column('detalhe'), sa.column('ativo', sa.Boolean()))
+        ano = sa.extract('year', origem.c.data)
+        mes = sa.extract('month', origem.c.data)
+        conexao.execute(resumo.insert().from_select(
+            ['ano', 'mes', 'tipo', 'categoria', 'total', 'quantidade'],
+            sa.select(ano, mes, origem.c.tipo, origem.c.detalhe, sa.func.sum(origem.c.valor), sa.func.count())
+            .where(origem.c.ativo == sa.true())
+            .group_by(ano, mes, origem.c.tipo, origem.c.detalhe)
+        ))
+
+
+def downgrade():
+    # As tabelas continuam sendo usadas pelas revisões anteriores (que as
+    # criavam com create_all); não há o que desfazer
+    pass
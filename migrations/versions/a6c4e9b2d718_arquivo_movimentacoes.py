@@ -0,0 +1,41 @@
+"""Arquivo de movimentações excluídas e de anos fechados
+
+Revision ID: a6c4e9b2d718
+Revises: f3a9d2e6c105
+Create Date: 2026-10-18 21:47:09.318254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c4e9b2d718'
+down_revision = 'f3a9d2e6c105'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('movimentacao_arquivo',
+        sa.Column('tipo', sa.String(length=10), nullable=False),
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('valor', sa.BigInteger(), nullable=False),
+        sa.Column('data', sa.Date(), nullable=False),
+        sa.Column('detalhe', sa.String(length=100), nullable=False),
+        sa.Column('descricao', sa.String(length=200), nullable=True),
+        sa.Column('parcela_numero', sa.Integer(), nullable=True),
+        sa.Column('parcela_total', sa.Integer(), nullable=True),
+        sa.Column('ativo', sa.Boolean(), nullable=False),
+        sa.Column('arquivado_em', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('tipo', 'id')
+    )
+    with op.batch_alter_table('movimentacao_arquivo', schema=None) as batch_op:
+        batch_op.create_index('ix_movimentacao_arquivo_data', ['data'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('movimentacao_arquivo', schema=None) as batch_op:
+        batch_op.drop_index('ix_movimentacao_arquivo_data')
+
+    op.drop_table('movimentacao_arquivo')
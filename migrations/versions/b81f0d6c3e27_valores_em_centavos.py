@@ -0,0 +1,49 @@
+"""Valores monetários em centavos inteiros
+
+Revision ID: b81f0d6c3e27
+Revises: 7c2e9a4b5d13
+Create Date: 2026-10-18 11:40:02.550917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81f0d6c3e27'
+down_revision = '7c2e9a4b5d13'
+branch_labels = None
+depends_on = None
+
+TABELAS = ('ganho', 'despesa', 'cartao_credito', 'donativo')
+
+
+def _alterar(tabela, coluna, tipo_antigo, tipo_novo, expressao):
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column(tabela, coluna, type_=tipo_novo, existing_type=tipo_antigo,
+                        existing_nullable=False, postgresql_using=expressao)
+    else:
+        # SQLite não altera tipo de coluna: converte os valores e recria a tabela
+        op.execute(f'UPDATE {tabela} SET {coluna} = {expressao}')
+        with op.batch_alter_table(tabela) as batch_op:
+            batch_op.alter_column(coluna, type_=tipo_novo, existing_type=tipo_antigo, existing_nullable=False)
+
+
+def upgrade():
+    for tabela in TABELAS:
+        _alterar(tabela, 'valor', sa.Float(), sa.BigInteger(), 'CAST(ROUND(valor * 100) AS BIGINT)')
+
+    # resumo_mensal é derivado: esvazia aqui e é reconstruído em centavos pela
+    # migração 9e4a7c2b1f58 (ou por `flask rebuild-resumo`)
+    if 'resumo_mensal' in sa.inspect(op.get_bind()).get_table_names():
+        op.execute('DELETE FROM resumo_mensal')
+        _alterar('resumo_mensal', 'total', sa.Float(), sa.BigInteger(), 'CAST(ROUND(total * 100) AS BIGINT)')
+
+
+def downgrade():
+    if 'resumo_mensal' in sa.inspect(op.get_bind()).get_table_names():
+        op.execute('DELETE FROM resumo_mensal')
+        _alterar('resumo_mensal', 'total', sa.BigInteger(), sa.Float(), 'total / 100.0')
+
+    for tabela in TABELAS:
+        _alterar(tabela, 'valor', sa.BigInteger(), sa.Float(), 'valor / 100.0')
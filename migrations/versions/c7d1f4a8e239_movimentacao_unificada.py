@@ -0,0 +1,131 @@
+"""Tabela única movimentacao com discriminador tipo
+
+Revision ID: c7d1f4a8e239
+Revises: a6c4e9b2d718
+Create Date: 2026-10-18 22:31:44.805127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d1f4a8e239'
+down_revision = 'a6c4e9b2d718'
+branch_labels = None
+depends_on = None
+
+# Mesma ordem de models.MODELOS: (tipo, tabela antiga, coluna de detalhe, tamanho)
+TABELAS = [
+    ('ganho', 'ganho', 'origem', 50),
+    ('despesa', 'despesa', 'categoria', 50),
+    ('cartao', 'cartao_credito', 'parcela', 20),
+    ('donativo', 'donativo', 'instituicao', 100),
+]
+
+
+def _novo_id(chave):
+    # Novo id = id antigo * 4 + índice do tipo: único entre os tipos, sem tabela
+    # de correspondência, e igual à chave que o índice de busca do SQLite já usava
+    casos = ' '.join(f"WHEN '{tipo}' THEN {indice}" for indice, (tipo, *_) in enumerate(TABELAS))
+    return f'{chave} * {len(TABELAS)} + CASE tipo {casos} END'
+
+
+def _ajustar_sequencia(conexao, tabela):
+    if conexao.dialect.name == 'postgresql':
+        conexao.execute(sa.text(
+            f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {tabela}"
+        ))
+
+
+def _remapear(tabela, coluna):
+    # Em duas etapas (negativo e depois o novo valor) para a chave primária
+    # nunca colidir no meio do UPDATE
+    op.execute(f'UPDATE {tabela} SET {coluna} = -{coluna}')
+    op.execute(f'UPDATE {tabela} SET {coluna} = {_novo_id(f"(-{coluna})")}')
+
+
+def upgrade():
+    conexao = op.get_bind()
+    op.create_table('movimentacao',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=10), nullable=False),
+        sa.Column('valor', sa.BigInteger(), nullable=False),
+        sa.Column('data', sa.Date(), nullable=False),
+        sa.Column('detalhe', sa.String(length=100), nullable=False),
+        sa.Column('parcela_numero', sa.Integer(), server_default='1', nullable=False),
+        sa.Column('parcela_total', sa.Integer(), server_default='1', nullable=False),
+        sa.Column('ativo', sa.Boolean(), nullable=False),
+        sa.Column('descricao', sa.String(length=200), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    for indice, (tipo, tabela, coluna, _) in enumerate(TABELAS):
+        parcela = 'parcela_numero, parcela_total' if tipo == 'cartao' else '1, 1'
+        op.execute(
+            'INSERT INTO movimentacao (id, tipo, valor, data, detalhe, parcela_numero, parcela_total, ativo, descricao) '
+            f"SELECT id * {len(TABELAS)} + {indice}, '{tipo}', valor, data, {coluna}, {parcela}, ativo, descricao "
+            f'FROM {tabela}'
+        )
+    _ajustar_sequencia(conexao, 'movimentacao')
+    with op.batch_alter_table('movimentacao', schema=None) as batch_op:
+        batch_op.create_index('ix_movimentacao_ativo_data_id', ['ativo', 'data', 'id'], unique=False)
+        batch_op.create_index('ix_movimentacao_ativo_tipo_data', ['ativo', 'tipo', 'data'], unique=False)
+        batch_op.create_index('ix_movimentacao_ativo_detalhe_data', ['ativo', 'detalhe', 'data'], unique=False)
+
+    _remapear('movimentacao_arquivo', 'id')
+
+    # Índice de busca: a chave (tipo, id) passa a usar o novo id
+    if conexao.dialect.name == 'postgresql':
+        _remapear('busca_movimentacao', 'mov_id')
+    else:
+        # rowid = id * 4 + índice; com o novo id vira rowid * 4 + rowid % 4.
+        # FTS5 não aceita UPDATE de rowid em massa: copia e regrava
+        op.execute(
+            'CREATE TEMP TABLE busca_remapeada AS '
+            f'SELECT rowid * {len(TABELAS)} + rowid % {len(TABELAS)} AS chave, texto, data FROM busca_movimentacao'
+        )
+        op.execute('DELETE FROM busca_movimentacao')
+        op.execute('INSERT INTO busca_movimentacao (rowid, texto, data) SELECT chave, texto, data FROM busca_remapeada')
+        op.execute('DROP TABLE busca_remapeada')
+
+    for _, tabela, _, _ in TABELAS:
+        op.drop_table(tabela)
+
+
+def downgrade():
+    # As tabelas por tipo voltam com os ids unificados (únicos também dentro
+    # de cada tipo); arquivo e índice de busca continuam válidos sem remapear
+    conexao = op.get_bind()
+    for tipo, tabela, coluna, tamanho in TABELAS:
+        colunas = [
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('valor', sa.BigInteger(), nullable=False),
+            sa.Column('data', sa.Date(), nullable=False),
+            sa.Column(coluna, sa.String(length=tamanho), nullable=False),
+        ]
+        if tipo == 'cartao':
+            colunas += [
+                sa.Column('parcela_numero', sa.Integer(), server_default='1', nullable=False),
+                sa.Column('parcela_total', sa.Integer(), server_default='1', nullable=False),
+            ]
+        op.create_table(tabela, *colunas,
+            sa.Column('ativo', sa.Boolean(), nullable=False),
+            sa.Column('descricao', sa.String(length=200), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        parcela = ', parcela_numero, parcela_total' if tipo == 'cartao' else ''
+        op.execute(
+            f'INSERT INTO {tabela} (id, valor, data, {coluna}{parcela}, ativo, descricao) '
+            f"SELECT id, valor, data, SUBSTR(detalhe, 1, {tamanho}){parcela}, ativo, descricao "
+            f"FROM movimentacao WHERE tipo = '{tipo}'"
+        )
+        _ajustar_sequencia(conexao, tabela)
+        op.create_index(f'ix_{tabela}_ativo_data', tabela, ['ativo', 'data'], unique=False)
+        op.create_index(f'ix_{tabela}_ativo_{coluna}_data', tabela, ['ativo', coluna, 'data'], unique=False)
+
+    with op.batch_alter_table('movimentacao', schema=None) as batch_op:
+        batch_op.drop_index('ix_movimentacao_ativo_detalhe_data')
+        batch_op.drop_index('ix_movimentacao_ativo_tipo_data')
+        batch_op.drop_index('ix_movimentacao_ativo_data_id')
+
+    op.drop_table('movimentacao')
@@ -0,0 +1,71 @@
+"""Índice de busca textual (FTS5 / tsvector + GIN)
+
+Revision ID: d4e7a1c9b820
+Revises: b81f0d6c3e27
+Create Date: 2026-10-18 19:05:31.402118
+
+"""
+import unicodedata
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4e7a1c9b820'
+down_revision = 'b81f0d6c3e27'
+branch_labels = None
+depends_on = None
+
+# Mesma ordem de models.MODELOS: o rowid do FTS5 é id * 4 + índice do tipo
+TABELAS = [
+    ('ganho', 'ganho', 'origem'),
+    ('despesa', 'despesa', 'categoria'),
+    ('cartao', 'cartao_credito', None),
+    ('donativo', 'donativo', 'instituicao'),
+]
+
+
+def _normalizar(texto):
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def upgrade():
+    conexao = op.get_bind()
+    postgres = conexao.dialect.name == 'postgresql'
+    if postgres:
+        op.execute(
+            'CREATE TABLE busca_movimentacao ('
+            'tipo VARCHAR(10) NOT NULL, mov_id INTEGER NOT NULL, data DATE NOT NULL, '
+            'documento TSVECTOR NOT NULL, PRIMARY KEY (tipo, mov_id))'
+        )
+        op.execute('CREATE INDEX ix_busca_movimentacao_documento ON busca_movimentacao USING gin (documento)')
+        inserir = sa.text(
+            'INSERT INTO busca_movimentacao (tipo, mov_id, data, documento) '
+            "VALUES (:tipo, :id, :data, to_tsvector('portuguese', :texto))"
+        )
+    else:
+        op.execute(
+            'CREATE VIRTUAL TABLE busca_movimentacao USING fts5('
+            "texto, data UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        inserir = sa.text('INSERT INTO busca_movimentacao (rowid, texto, data) VALUES (:rowid, :texto, :data)')
+
+    for indice, (tipo, tabela, coluna) in enumerate(TABELAS):
+        colunas = f'id, data, descricao, {coluna}' if coluna else 'id, data, descricao, NULL'
+        resultado = conexao.execute(sa.text(f'SELECT {colunas} FROM {tabela} WHERE ativo = :ativo'), {'ativo': True})
+        while True:
+            linhas = resultado.fetchmany(5000)
+            if not linhas:
+                break
+            conexao.execute(inserir, [{
+                'tipo': tipo,
+                'id': id,
+                'rowid': id * len(TABELAS) + indice,
+                'data': data if postgres else str(data),
+                'texto': _normalizar(' '.join(p for p in (descricao, detalhe) if p))
+            } for id, data, descricao, detalhe in linhas])
+
+
+def downgrade():
+    op.execute('DROP TABLE busca_movimentacao')
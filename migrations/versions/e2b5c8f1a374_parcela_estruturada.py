@@ -0,0 +1,56 @@
+"""Parcela do cartão decomposta em parcela_numero/parcela_total
+
+Revision ID: e2b5c8f1a374
+Revises: d4e7a1c9b820
+Create Date: 2026-10-18 20:14:52.771305
+
+"""
+import re
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b5c8f1a374'
+down_revision = 'd4e7a1c9b820'
+branch_labels = None
+depends_on = None
+
+# Cópia de importacao.parse_parcela no momento da migração
+PARCELAS_MAX = 48
+_PARCELA = re.compile(r'^\s*(\d{1,3})\s*(?:/|de)\s*(\d{1,3})\s*$', re.IGNORECASE)
+
+
+def _parse_parcela(texto):
+    match = _PARCELA.match(texto or '')
+    if not match:
+        return 1, 1
+    numero, total = int(match.group(1)), int(match.group(2))
+    if not 1 <= numero <= total <= PARCELAS_MAX:
+        return 1, 1
+    return numero, total
+
+
+def upgrade():
+    with op.batch_alter_table('cartao_credito') as batch_op:
+        batch_op.add_column(sa.Column('parcela_numero', sa.Integer(), nullable=False, server_default='1'))
+        batch_op.add_column(sa.Column('parcela_total', sa.Integer(), nullable=False, server_default='1'))
+
+    # Poucos textos distintos ("À vista", "1/3", ...): um UPDATE por valor distinto
+    conexao = op.get_bind()
+    valores = [
+        {'parcela': parcela, 'numero': numero, 'total': total}
+        for (parcela,) in conexao.execute(sa.text('SELECT DISTINCT parcela FROM cartao_credito'))
+        for numero, total in [_parse_parcela(parcela)]
+        if (numero, total) != (1, 1)
+    ]
+    if valores:
+        conexao.execute(sa.text(
+            'UPDATE cartao_credito SET parcela_numero = :numero, parcela_total = :total WHERE parcela = :parcela'
+        ), valores)
+
+
+def downgrade():
+    with op.batch_alter_table('cartao_credito') as batch_op:
+        batch_op.drop_column('parcela_total')
+        batch_op.drop_column('parcela_numero')
@@ -0,0 +1,45 @@
+"""Regras recorrentes e chaves de idempotência das ocorrências
+
+Revision ID: f3a9d2e6c105
+Revises: e2b5c8f1a374
+Create Date: 2026-10-18 21:02:17.563940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9d2e6c105'
+down_revision = 'e2b5c8f1a374'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('recorrencia',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=10), nullable=False),
+        sa.Column('valor', sa.BigInteger(), nullable=False),
+        sa.Column('detalhe', sa.String(length=100), nullable=False),
+        sa.Column('descricao', sa.String(length=200), nullable=True),
+        sa.Column('frequencia', sa.String(length=10), nullable=False),
+        sa.Column('dia', sa.Integer(), nullable=False),
+        sa.Column('intervalo', sa.Integer(), nullable=False),
+        sa.Column('data_inicio', sa.Date(), nullable=False),
+        sa.Column('data_fim', sa.Date(), nullable=True),
+        sa.Column('gerada_ate', sa.Date(), nullable=True),
+        sa.Column('ativo', sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('recorrencia_ocorrencia',
+        sa.Column('recorrencia_id', sa.Integer(), nullable=False),
+        sa.Column('data', sa.Date(), nullable=False),
+        sa.ForeignKeyConstraint(['recorrencia_id'], ['recorrencia.id'], ),
+        sa.PrimaryKeyConstraint('recorrencia_id', 'data')
+    )
+
+
+def downgrade():
+    op.drop_table('recorrencia_ocorrencia')
+    op.drop_table('recorrencia')
@@ -1,43 +1,147 @@
-from flask_sqlalchemy import SQLAlchemy
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy.types import TypeDecorator, BigInteger
+from extensions import db
 
-db = SQLAlchemy()
+CENTAVO = Decimal('0.01')
+ZERO = Decimal('0.00')
 
-class Ganho(db.Model):
+# Valores monetários: centavos inteiros no banco, Decimal no Python.
+# SUM no SQL é feito sobre inteiros, portanto exato.
+class Centavos(TypeDecorator):
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return int((Decimal(str(value)) * 100).quantize(Decimal(1), ROUND_HALF_UP))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return Decimal(int(value)) * CENTAVO
+
+# Models
+# Ganhos, despesas, cartão e donativos numa única tabela com discriminador
+# `tipo`: extrato, exclusões e totais são uma query só, qualquer que seja o
+# número de tipos. As classes de cada tipo são herança de tabela única e
+# mantêm o nome antigo da coluna de detalhe como sinônimo.
+class Movimentacao(db.Model):
+    __tablename__ = 'movimentacao'
+    __table_args__ = (
+        db.Index('ix_movimentacao_ativo_data_id', 'ativo', 'data', 'id'),
+        db.Index('ix_movimentacao_ativo_tipo_data', 'ativo', 'tipo', 'data'),
+        db.Index('ix_movimentacao_ativo_detalhe_data', 'ativo', 'detalhe', 'data'),
+        # Sem AUTOINCREMENT o SQLite reaproveita o maior id depois que a linha
+        # vai para movimentacao_arquivo, e o id passa a apontar para duas linhas
+        {'sqlite_autoincrement': True},
+    )
     id = db.Column(db.Integer, primary_key=True)
-    valor = db.Column(db.Float, nullable=False)
-    descricao = db.Column(db.String(200))
+    tipo = db.Column(db.String(10), nullable=False)
+    valor = db.Column(Centavos, nullable=False)
     data = db.Column(db.Date, nullable=False)
-    origem = db.Column(db.String(50))  # Ex: Restaurante Fixo, iFood
-    
-    def __repr__(self):
-        return f'<Ganho {self.descricao} - R${self.valor}>'
+    # Origem, categoria, parcela ou instituição, conforme o tipo
+    detalhe = db.Column(db.String(100), nullable=False)
+    # "3/10" -> numero 3, total 10; "À vista" e demais tipos -> 1/1 (ver importacao.parse_parcela)
+    parcela_numero = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    parcela_total = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    ativo = db.Column(db.Boolean, default=True, nullable=False)
+    descricao = db.Column(db.String(200))
+
+    __mapper_args__ = {'polymorphic_on': tipo}
+
+class Ganho(Movimentacao):
+    __mapper_args__ = {'polymorphic_identity': 'ganho'}
+    origem = db.synonym('detalhe')
+
+class Despesa(Movimentacao):
+    __mapper_args__ = {'polymorphic_identity': 'despesa'}
+    categoria = db.synonym('detalhe')
+
+class CartaoCredito(Movimentacao):
+    __mapper_args__ = {'polymorphic_identity': 'cartao'}
+    parcela = db.synonym('detalhe')
+
+class Donativo(Movimentacao):
+    __mapper_args__ = {'polymorphic_identity': 'donativo'}
+    instituicao = db.synonym('detalhe')
 
-class Despesa(db.Model):
+class CategoriaDespesa(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    valor = db.Column(db.Float, nullable=False)
-    descricao = db.Column(db.String(200))
-    data = db.Column(db.Date, nullable=False)
-    categoria = db.Column(db.String(50))  # Ex: Alimentação, Transporte
-    
-    def __repr__(self):
-        return f'<Despesa {self.descricao} - R${self.valor}>'
+    nome = db.Column(db.String(50), nullable=False, unique=True)
+    ativo = db.Column(db.Boolean, default=True)
+    # Orçamento mensal; sem orçamento a categoria não entra na comparação
+    orcamento = db.Column(Centavos)
+
+# Totais mensais pré-agregados, mantidos na mesma transação das escritas
+class ResumoMensal(db.Model):
+    __tablename__ = 'resumo_mensal'
+    ano = db.Column(db.Integer, primary_key=True)
+    mes = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(20), primary_key=True)
+    categoria = db.Column(db.String(100), primary_key=True)
+    total = db.Column(Centavos, nullable=False, default=0)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
 
-class CartaoCredito(db.Model):
+# Contador global incrementado a cada escrita em movimentações
+class VersaoDados(db.Model):
+    __tablename__ = 'versao_dados'
     id = db.Column(db.Integer, primary_key=True)
-    valor = db.Column(db.Float, nullable=False)
-    descricao = db.Column(db.String(200))
+    versao = db.Column(db.Integer, nullable=False, default=0)
+
+# Movimentações retiradas da tabela quente: excluídas (ativo = False) ou de
+# anos fechados. O id original é mantido para a restauração; os totais desses
+# anos continuam no resumo_mensal.
+class MovimentacaoArquivo(db.Model):
+    __tablename__ = 'movimentacao_arquivo'
+    __table_args__ = (
+        db.Index('ix_movimentacao_arquivo_data', 'data'),
+    )
+    tipo = db.Column(db.String(10), primary_key=True)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    valor = db.Column(Centavos, nullable=False)
     data = db.Column(db.Date, nullable=False)
-    parcela = db.Column(db.String(20))  # Ex: 1/3, À vista
-    
-    def __repr__(self):
-        return f'<Cartao {self.descricao} - R${self.valor}>'
+    detalhe = db.Column(db.String(100), nullable=False)
+    descricao = db.Column(db.String(200))
+    parcela_numero = db.Column(db.Integer)
+    parcela_total = db.Column(db.Integer)
+    ativo = db.Column(db.Boolean, nullable=False)
+    arquivado_em = db.Column(db.DateTime, nullable=False)
 
-class Donativo(db.Model):
+# Regra de lançamento recorrente (salário, aluguel, assinaturas...)
+class Recorrencia(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    valor = db.Column(db.Float, nullable=False)
+    tipo = db.Column(db.String(10), nullable=False)
+    valor = db.Column(Centavos, nullable=False)
+    detalhe = db.Column(db.String(100), nullable=False)
     descricao = db.Column(db.String(200))
-    data = db.Column(db.Date, nullable=False)
-    instituicao = db.Column(db.String(100))
-    
-    def __repr__(self):
-        return f'<Donativo {self.instituicao} - R${self.valor}>'
\ No newline at end of file
+    frequencia = db.Column(db.String(10), nullable=False)
+    # Dia do mês (1-31, limitado ao último dia) ou da semana (0 = segunda)
+    dia = db.Column(db.Integer, nullable=False)
+    intervalo = db.Column(db.Integer, nullable=False, default=1)
+    data_inicio = db.Column(db.Date, nullable=False)
+    data_fim = db.Column(db.Date)
+    # Até onde as ocorrências já foram geradas
+    gerada_ate = db.Column(db.Date)
+    ativo = db.Column(db.Boolean, default=True, nullable=False)
+
+# Chave de idempotência: uma linha por ocorrência já materializada
+class RecorrenciaOcorrencia(db.Model):
+    __tablename__ = 'recorrencia_ocorrencia'
+    recorrencia_id = db.Column(db.Integer, db.ForeignKey('recorrencia.id'), primary_key=True)
+    data = db.Column(db.Date, primary_key=True)
+
+MODELOS = {
+    'ganho': Ganho,
+    'despesa': Despesa,
+    'cartao': CartaoCredito,
+    'donativo': Donativo
+}
+
+# Nome do detalhe em cada tipo (sinônimo de Movimentacao.detalhe)
+DETALHES = {
+    'ganho': Ganho.origem,
+    'despesa': Despesa.categoria,
+    'cartao': CartaoCredito.parcela,
+    'donativo': Donativo.instituicao
+}
@@ -0,0 +1,88 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Perfis de engine escolhidos por DB_PERFIL. "padrao" mantém os defaults do
+# SQLAlchemy; "otimizado" liga WAL no SQLite (leitores não bloqueiam o escritor)
+# e dimensiona o pool do Postgres.
+PERFIS = {
+    'padrao': {
+        'sqlite': {},
+        'pool': {}
+    },
+    'otimizado': {
+        'sqlite': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            'cache_size': -64000,        # KiB (64 MiB)
+            'mmap_size': 268435456,      # 256 MiB
+            'temp_store': 'MEMORY'
+        },
+        'pool': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_timeout': 30,
+            'pool_recycle': 1800,
+            'pool_pre_ping': True
+        }
+    }
+}
+
+PERFIL_PADRAO = 'otimizado'
+
+# Cada valor do perfil pode ser sobrescrito individualmente por variável de ambiente
+ENV_POOL = {
+    'pool_size': ('DB_POOL_SIZE', int),
+    'max_overflow': ('DB_MAX_OVERFLOW', int),
+    'pool_timeout': ('DB_POOL_TIMEOUT', int),
+    'pool_recycle': ('DB_POOL_RECYCLE', int),
+    'pool_pre_ping': ('DB_POOL_PRE_PING', lambda v: v.lower() in ('1', 'true', 'sim', 'yes'))
+}
+
+ENV_SQLITE = {
+    'journal_mode': 'SQLITE_JOURNAL_MODE',
+    'synchronous': 'SQLITE_SYNCHRONOUS',
+    'busy_timeout': 'SQLITE_BUSY_TIMEOUT',
+    'cache_size': 'SQLITE_CACHE_SIZE',
+    'mmap_size': 'SQLITE_MMAP_SIZE',
+    'temp_store': 'SQLITE_TEMP_STORE'
+}
+
+
+def obter_perfil(nome):
+    if nome not in PERFIS:
+        raise ValueError(f'Perfil de banco desconhecido: {nome!r} (opções: {", ".join(PERFIS)})')
+    return PERFIS[nome]
+
+
+def pragmas_sqlite(nome):
+    pragmas = dict(obter_perfil(nome)['sqlite'])
+    for pragma, variavel in ENV_SQLITE.items():
+        if os.getenv(variavel):
+            pragmas[pragma] = os.getenv(variavel)
+    return pragmas
+
+
+def opcoes_engine(uri, nome):
+    # Valor de SQLALCHEMY_ENGINE_OPTIONS; pool só vale para bancos com servidor
+    if make_url(uri).get_backend_name() == 'sqlite':
+        return {}
+    opcoes = dict(obter_perfil(nome)['pool'])
+    for chave, (variavel, converter) in ENV_POOL.items():
+        if os.getenv(variavel):
+            opcoes[chave] = converter(os.getenv(variavel))
+    return opcoes
+
+
+def configurar_sqlite(engine, pragmas):
+    # Pragmas são por conexão, então rodam a cada conexão nova do pool
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {pragma}={valor}')
+        cursor.close()
@@ -0,0 +1,60 @@
+import calendar
+from datetime import date, timedelta
+
+# Tipos que aceitam recorrência (cartão já tem parcelas)
+TIPOS = ('ganho', 'despesa', 'donativo')
+
+FREQUENCIAS = ('mensal', 'semanal')
+
+DIAS_SEMANA = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+
+
+def validar(tipo, frequencia, dia, intervalo, data_inicio, data_fim):
+    if tipo not in TIPOS:
+        raise ValueError(f'Tipo sem suporte a recorrência: {tipo}')
+    if frequencia not in FREQUENCIAS:
+        raise ValueError(f'Frequência inválida: {frequencia}')
+    if frequencia == 'mensal' and not 1 <= dia <= 31:
+        raise ValueError('Dia do mês deve estar entre 1 e 31')
+    if frequencia == 'semanal' and not 0 <= dia <= 6:
+        raise ValueError('Dia da semana deve estar entre 0 (segunda) e 6 (domingo)')
+    if intervalo < 1:
+        raise ValueError('Intervalo deve ser pelo menos 1')
+    if data_fim and data_fim < data_inicio:
+        raise ValueError('Data final anterior à inicial')
+
+
+def _mensais(dia, intervalo, inicio, fim):
+    ano, mes = inicio.year, inicio.month
+    while True:
+        # Dia 31 vira o último dia em meses mais curtos
+        data = date(ano, mes, min(dia, calendar.monthrange(ano, mes)[1]))
+        if data > fim:
+            return
+        if data >= inicio:
+            yield data
+        ano, mes = divmod(ano * 12 + mes - 1 + intervalo, 12)
+        mes += 1
+
+
+def _semanais(dia, intervalo, inicio, fim):
+    data = inicio + timedelta(days=(dia - inicio.weekday()) % 7)
+    passo = timedelta(weeks=intervalo)
+    while data <= fim:
+        yield data
+        data += passo
+
+
+def ocorrencias(recorrencia, ate):
+    # Datas devidas de uma regra até `ate` (inclusive), a partir de onde a
+    # última materialização parou. O passo conta sempre de data_inicio, então
+    # retomar no meio não desloca a série.
+    fim = min(ate, recorrencia.data_fim) if recorrencia.data_fim else ate
+    desde = recorrencia.data_inicio
+    if recorrencia.gerada_ate:
+        desde = max(desde, recorrencia.gerada_ate + timedelta(days=1))
+    if desde > fim:
+        return []
+    gerar = _mensais if recorrencia.frequencia == 'mensal' else _semanais
+    return [data for data in gerar(recorrencia.dia, recorrencia.intervalo, recorrencia.data_inicio, fim)
+            if data >= desde]
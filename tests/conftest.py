@@ -0,0 +1,81 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, or_, select, text
+from app import create_app
+from extensions import db
+from models import ZERO, Movimentacao, MovimentacaoArquivo, ResumoMensal
+from ledger import (CHAVES_TOTAIS, inicializar_banco, gravar_movimentacoes, reconstruir_resumo, consultar_totais,
+                    totais_dashboard)
+import busca
+import gerador
+
+
+@pytest.fixture
+def app(tmp_path):
+    # Um SQLite novo por teste, com o schema e as categorias de `flask init-db`
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'teste.db'),
+        'TESTING': True,
+        'JINJA_CACHE_DIR': ''
+    })
+    with app.app_context():
+        inicializar_banco()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def populado(app):
+    # Movimentações sintéticas reproduzíveis (mesmo gerador do benchmark)
+    gravar_movimentacoes(gerador.gerar_movimentacoes(2000, semente=1))
+    db.session.commit()
+    return app
+
+
+@pytest.fixture
+def cliente(populado):
+    return populado.test_client()
+
+
+def _resumo():
+    # Linhas zeradas pelo upsert incremental equivalem a não ter a linha
+    return sorted(tuple(linha) for linha in db.session.execute(
+        select(ResumoMensal.ano, ResumoMensal.mes, ResumoMensal.tipo, ResumoMensal.categoria,
+               ResumoMensal.total, ResumoMensal.quantidade)
+        .where(or_(ResumoMensal.total != 0, ResumoMensal.quantidade != 0))
+    ))
+
+
+def _indice_busca():
+    return sorted(tuple(linha) for linha in db.session.execute(
+        text(f'SELECT rowid, texto, data FROM {busca.TABELA}')))
+
+
+@pytest.fixture
+def conferir(app):
+    # Confere os derivados mantidos incrementalmente (resumo_mensal, totais em
+    # cache, índice de busca) contra a reconstrução do zero
+    def conferir():
+        db.session.commit()
+        resumo, indice = _resumo(), _indice_busca()
+        totais = totais_dashboard()
+
+        reconstruir_resumo()
+        busca.reconstruir_indice()
+        assert resumo == _resumo()
+        assert indice == _indice_busca()
+
+        esperado = {chave: ZERO for chave in CHAVES_TOTAIS.values()}
+        for model in (Movimentacao, MovimentacaoArquivo):
+            for tipo, total in db.session.execute(
+                    select(model.tipo, func.sum(model.valor)).where(model.ativo == True).group_by(model.tipo)):
+                esperado[CHAVES_TOTAIS[tipo]] += total
+        esperado['saldo'] = esperado['ganhos'] - esperado['despesas'] - esperado['cartao'] - esperado['donativos']
+        assert consultar_totais()[0] == esperado
+        assert totais == esperado
+    return conferir
@@ -0,0 +1,65 @@
+import math
+from datetime import date
+from decimal import Decimal
+import numpy as np
+from extensions import db
+from ledger import criar_movimentacao, definir_orcamentos, consultar_analise_categorias
+import analise
+
+
+def test_matriz_mensal():
+    nomes, matriz = analise.matriz_mensal([0, 1, 1, 2], ['A', 'B', 'B', 'A'], [100, 200, 50, 300], 3)
+    assert nomes == ['A', 'B']
+    assert matriz.tolist() == [[100, 0, 300], [0, 250, 0]]
+
+
+def test_media_movel():
+    matriz = np.array([[3, 6, 9, 12]])
+    # Começo da série divide pelos meses disponíveis
+    assert analise.media_movel(matriz, 2).tolist() == [[3, 4.5, 7.5, 10.5]]
+    assert analise.media_movel(matriz, 3).tolist() == [[3, 4.5, 6, 9]]
+
+
+def test_zscores():
+    z = analise.zscores(np.array([[10, 20, 10, 20, 40], [5, 5, 5, 5, 5]]), janela=12)
+    # Menos de 3 meses de histórico, ou histórico constante: sem z-score
+    assert np.isnan(z[:, :3]).all() and np.isnan(z[1]).all()
+    # Mês 3 contra [10, 20, 10]: média 13,33, desvio 4,71
+    assert math.isclose(z[0, 3], math.sqrt(2))
+    # Mês 4 contra [10, 20, 10, 20]: média 15, desvio 5
+    assert math.isclose(z[0, 4], 5.0)
+    # Janela de 3: mês 4 só contra [20, 10, 20]
+    assert math.isclose(analise.zscores(np.array([[10, 20, 10, 20, 40]]), janela=3)[0, 4], 3.5 * math.sqrt(2))
+
+
+def test_analisar_marca_anomalia_e_orcamento():
+    matriz = np.array([[10, 20, 10, 20, 40], [1, 1, 1, 1, 1]])
+    resultado = analise.analisar(matriz, [30, float('nan')])
+    assert resultado['anomalia'].tolist() == [[False] * 4 + [True], [False] * 5]
+    assert resultado['diferenca'][0].tolist() == [20, 10, 20, 10, -10]
+    assert np.isnan(resultado['diferenca'][1]).all()
+    # Gasto abaixo do padrão nunca é anomalia
+    assert not analise.analisar(np.array([[40, 40, 40, 45, 0]]), [np.nan])['anomalia'].any()
+
+
+def test_consultar_analise_categorias(app):
+    for mes, valor in zip(range(1, 7), (100, 100, 100, 100, 100, 400)):
+        criar_movimentacao('despesa', Decimal(valor), date(2025, mes, 10), 'cinema', 'Lazer')
+    definir_orcamentos({'Lazer': Decimal('150.00'), 'Saúde': Decimal('80.00')})
+    db.session.commit()
+
+    relatorio = consultar_analise_categorias(3, date(2025, 6, 20))
+    assert relatorio['meses'] == [{'ano': 2025, 'mes': m} for m in (4, 5, 6)]
+    lazer, saude = relatorio['categorias']
+    assert (lazer['nome'], lazer['total'], lazer['media_mensal']) == ('Lazer', Decimal('600.00'), Decimal('200.00'))
+    assert (lazer['meses_acima_orcamento'], lazer['anomalias']) == (1, 1)
+    junho = lazer['meses'][-1]
+    assert junho['media_3'] == Decimal('200.00')
+    # 12 meses até junho: 900 / 12
+    assert junho['media_12'] == Decimal('75.00')
+    assert junho['diferenca_orcamento'] == Decimal('-250.00')
+    assert junho['anomalia'] and junho['zscore'] == 7.27
+    assert [m['anomalia'] for m in lazer['meses']] == [False, False, True]
+    # Orçamento sem gasto aparece zerado
+    assert (saude['nome'], saude['total'], saude['meses'][-1]['diferenca_orcamento']) == (
+        'Saúde', Decimal('0.00'), Decimal('80.00'))
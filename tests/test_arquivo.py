@@ -0,0 +1,68 @@
+from datetime import date
+from extensions import db
+from models import Movimentacao, MovimentacaoArquivo
+from ledger import (criar_movimentacao, excluir_registro, restaurar_registro, arquivar_inativos, arquivar_ano,
+                    aplicar_operacoes, consultar_projecao_cartao)
+
+
+def criar(descricao):
+    movimentacao = criar_movimentacao('despesa', 1000, date(2024, 3, 1), descricao, 'Lazer')
+    db.session.commit()
+    return movimentacao.id
+
+
+def arquivar_ultima(app):
+    id = criar('arquivada')
+    excluir_registro('despesa', id)
+    db.session.commit()
+    assert arquivar_inativos() == 1
+    return id
+
+
+def test_id_arquivado_nao_e_reaproveitado(app):
+    arquivada = arquivar_ultima(app)
+    # Era o maior id da tabela quente: sem AUTOINCREMENT, voltaria aqui
+    assert criar('nova') > arquivada
+
+    registro = restaurar_registro('despesa', arquivada)
+    db.session.commit()
+    assert registro.descricao == 'arquivada' and registro.ativo
+    assert db.session.get(MovimentacaoArquivo, ('despesa', arquivada)) is None
+
+    # Excluída e arquivada de novo, sem colidir com o que ficou no arquivo
+    excluir_registro('despesa', arquivada)
+    db.session.commit()
+    assert arquivar_inativos() == 1
+
+
+def test_restaurar_consulta_o_arquivo_antes(app, cliente):
+    arquivada = arquivar_ultima(app)
+    # Banco anterior ao AUTOINCREMENT: o id já foi dado a outra linha
+    db.session.add(Movimentacao(id=arquivada, tipo='ganho', valor=500, data=date(2024, 4, 1), detalhe='Salário',
+                                ativo=True))
+    db.session.commit()
+
+    resposta = cliente.post(f'/api/v1/movimentacoes/despesa/{arquivada}/restaurar')
+    assert resposta.status_code == 409
+    resultado, = aplicar_operacoes([{'tipo': 'despesa', 'id': arquivada, 'operacao': 'restaurar'}])
+    assert resultado['status'] == 'erro'
+    db.session.rollback()
+    assert db.session.get(MovimentacaoArquivo, ('despesa', arquivada)) is not None
+    assert db.session.get(Movimentacao, arquivada).tipo == 'ganho'
+
+
+def test_parcelas_futuras_de_ano_arquivado_continuam_na_projecao(app):
+    ano = date.today().year - 1
+    id = criar_movimentacao('cartao', 10000, date(ano, 12, 10), 'geladeira', '1/12').id
+    db.session.commit()
+    janeiro = date(ano + 1, 1, 1)
+    antes = consultar_projecao_cartao(12, janeiro)
+    assert [mes['projetado'] for mes in antes] == [10000] * 11 + [0]
+
+    assert arquivar_ano(ano) == 1
+    assert consultar_projecao_cartao(12, janeiro) == antes
+
+    # Excluída antes de ir para o arquivo, não projeta nada
+    db.session.get(MovimentacaoArquivo, ('cartao', id)).ativo = False
+    db.session.commit()
+    assert all(mes['total'] == 0 for mes in consultar_projecao_cartao(12, janeiro))
@@ -0,0 +1,46 @@
+import posixpath
+import re
+
+IMUTAVEL = 'public, max-age=31536000, immutable'
+
+
+def ativos_da_pagina(cliente, pagina='/'):
+    html = cliente.get(pagina).get_data(as_text=True)
+    return re.findall(r'(?:href|src)="([^"]+\.(?:css|js))"', html)
+
+
+def test_pagina_so_usa_ativos_locais(app):
+    urls = ativos_da_pagina(app.test_client())
+    assert len(urls) == 4
+    assert all(re.fullmatch(r'/ativos/vendor/[\w.-]+\.[0-9a-f]{12}\.(css|js)', url) for url in urls)
+
+
+def test_ativos_imutaveis_e_comprimidos(app):
+    cliente = app.test_client()
+    for url in ativos_da_pagina(cliente):
+        resposta = cliente.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert resposta.status_code == 200
+        assert resposta.headers['Cache-Control'] == IMUTAVEL
+        assert resposta.headers['Content-Encoding'] == 'gzip'
+        etag = resposta.headers['ETag']
+        assert cliente.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code == 304
+
+
+def test_fontes_dos_icones_com_hash(app):
+    cliente = app.test_client()
+    css, = [url for url in ativos_da_pagina(cliente) if 'bootstrap-icons' in url]
+    fontes = re.findall(r'url\("([^"]+)"\)', cliente.get(css).get_data(as_text=True))
+    assert len(fontes) == 2
+    for fonte in fontes:
+        resposta = cliente.get(posixpath.join(posixpath.dirname(css), fonte))
+        assert resposta.status_code == 200
+        assert resposta.mimetype.startswith('font/')
+        assert resposta.headers['Cache-Control'] == IMUTAVEL
+
+
+def test_nome_sem_hash_e_hash_antigo(app):
+    cliente = app.test_client()
+    resposta = cliente.get('/ativos/vendor/bootstrap.min.css')
+    assert resposta.status_code == 200
+    assert 'immutable' not in resposta.headers.get('Cache-Control', '')
+    assert cliente.get('/ativos/vendor/bootstrap.min.000000000000.css').status_code == 404
@@ -0,0 +1,48 @@
+from datetime import date
+from decimal import Decimal
+from extensions import db
+from ledger import criar_movimentacao, excluir_registro, arquivar_ano, restaurar_ano, consultar_busca
+import busca
+
+
+def _ids(consulta):
+    movimentacoes, _ = consultar_busca(consulta)
+    return [(m.tipo, m.id) for m in movimentacoes]
+
+
+def test_normalizar_texto():
+    assert busca.normalizar_texto('Março AÇÚCAR') == 'marco acucar'
+
+
+def test_prefixo_sem_acento_e_caixa(app):
+    marco = criar_movimentacao('despesa', Decimal('10.00'), date(2025, 3, 5), 'Feira de Março', 'Alimentação')
+    criar_movimentacao('despesa', Decimal('20.00'), date(2025, 3, 6), 'mercado', 'Alimentação')
+    db.session.commit()
+
+    esperado = [('despesa', marco.id)]
+    for consulta in ('marco', 'MARÇO', 'março', 'Mar', 'FEIRA marc'):
+        assert _ids(consulta) == esperado, consulta
+    # Todos os termos precisam casar, e o prefixo não casa no meio da palavra
+    assert _ids('março mercado') == []
+    assert _ids('arco') == []
+
+
+def test_exclusao_e_arquivo_removem_do_indice(app):
+    ano = date.today().year - 1
+    excluida = criar_movimentacao('despesa', Decimal('10.00'), date(ano + 1, 1, 5), 'março excluída', 'Lazer')
+    arquivada = criar_movimentacao('ganho', Decimal('20.00'), date(ano, 3, 6), 'março arquivada', 'Salário')
+    mantida = criar_movimentacao('ganho', Decimal('30.00'), date(ano + 1, 3, 6), 'março mantida', 'Salário')
+    db.session.commit()
+    ids = {'excluida': excluida.id, 'arquivada': arquivada.id, 'mantida': mantida.id}
+    assert len(_ids('março')) == 3
+
+    excluir_registro('despesa', ids['excluida'])
+    db.session.commit()
+    assert _ids('excluída') == []
+
+    arquivar_ano(ano)
+    assert _ids('março') == [('ganho', ids['mantida'])]
+
+    # Restaurar o ano devolve a linha ao índice
+    restaurar_ano(ano)
+    assert _ids('arquivada') == [('ganho', ids['arquivada'])]
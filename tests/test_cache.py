@@ -0,0 +1,45 @@
+from datetime import date
+from decimal import Decimal
+from cache import MemoriaBackend
+from extensions import db, cache_totais
+from ledger import criar_movimentacao, excluir_registro, consultar_totais, totais_dashboard
+
+
+def _snapshot():
+    # O que está no backend, sem passar por totais_dashboard (que recalcularia)
+    snapshot = cache_totais.backend.ler()
+    return snapshot and (snapshot['versao'], snapshot['totais'])
+
+
+def test_write_through_igual_ao_recalculo(populado):
+    assert isinstance(cache_totais.backend, MemoriaBackend)
+    totais_dashboard()
+
+    criada = criar_movimentacao('despesa', Decimal('12.34'), date(2025, 3, 1), 'padaria', 'Alimentação')
+    db.session.commit()
+    assert _snapshot() == consultar_totais()[::-1]
+
+    criada = criar_movimentacao('ganho', Decimal('1000.00'), date(2025, 3, 2), 'salário', 'Salário')
+    db.session.commit()
+    assert _snapshot() == consultar_totais()[::-1]
+
+    excluir_registro('ganho', criada.id)
+    db.session.commit()
+    assert _snapshot() == consultar_totais()[::-1]
+
+
+def test_rollback_descarta_deltas(populado):
+    totais_dashboard()
+    antes = _snapshot()
+
+    criada = criar_movimentacao('cartao', Decimal('99.90'), date(2025, 3, 1), 'loja', '1/3')
+    db.session.flush()
+    excluir_registro('cartao', criada.id)
+    db.session.rollback()
+    assert _snapshot() == antes == consultar_totais()[::-1]
+
+    # O commit seguinte parte da versão certa e continua aplicando o delta
+    criar_movimentacao('donativo', Decimal('5.00'), date(2025, 3, 1), 'doação', 'Instituição')
+    db.session.commit()
+    assert _snapshot() == consultar_totais()[::-1]
+    assert _snapshot()[0] == antes[0] + 1
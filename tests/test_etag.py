@@ -0,0 +1,32 @@
+from datetime import datetime
+import api
+
+
+def test_etag_revalida_sem_mudanca(cliente):
+    resposta = cliente.get('/api/v1/totais')
+    etag = resposta.headers['ETag']
+    assert cliente.get('/api/v1/totais', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_etag_muda_com_lancamento(cliente):
+    etag = cliente.get('/api/v1/totais').headers['ETag']
+    cliente.post('/api/v1/movimentacoes', json={
+        'tipo': 'despesa', 'valor': '10.00', 'data': '2024-03-01', 'detalhe': 'Lazer'
+    })
+    assert cliente.get('/api/v1/totais', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_etag_da_projecao_muda_na_virada_do_mes(cliente, monkeypatch):
+    etag = cliente.get('/api/v1/relatorios/cartao').headers['ETag']
+    assert cliente.get('/api/v1/relatorios/cartao', headers={'If-None-Match': etag}).status_code == 304
+
+    class MesSeguinte(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            hoje = datetime.now(tz)
+            return hoje.replace(year=hoje.year + hoje.month // 12, month=hoje.month % 12 + 1, day=1)
+
+    monkeypatch.setattr(api, 'datetime', MesSeguinte)
+    resposta = cliente.get('/api/v1/relatorios/cartao', headers={'If-None-Match': etag})
+    assert resposta.status_code == 200
+    assert resposta.headers['ETag'] != etag
@@ -0,0 +1,15 @@
+import csv
+import io
+import json
+
+
+def test_exportacoes_emitem_o_mesmo_valor_exato(cliente):
+    linhas_csv = list(csv.DictReader(io.StringIO(cliente.get('/extrato/export?format=csv').get_data(as_text=True))))
+    linhas_ndjson = [json.loads(linha)
+                     for linha in cliente.get('/extrato/export?format=ndjson').get_data(as_text=True).splitlines()]
+    assert linhas_csv and len(linhas_csv) == len(linhas_ndjson)
+    for linha_csv, linha_ndjson in zip(linhas_csv, linhas_ndjson):
+        # Dinheiro sai como string com duas casas, nunca como float
+        assert isinstance(linha_ndjson['valor'], str)
+        assert linha_ndjson['valor'] == linha_csv['valor']
+        assert linha_ndjson['valor'].split('.')[1].isdigit() and len(linha_ndjson['valor'].split('.')[1]) == 2
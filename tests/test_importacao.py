@@ -0,0 +1,136 @@
+import io
+from datetime import date
+from decimal import Decimal
+import pytest
+import importacao
+import ledger
+from ledger import importar_movimentacoes, consultar_totais
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('1.234,56', '1234.56'),
+    ('R$ 1.234.567,8', '1234567.8'),
+    ('-10,50', '-10.50'),
+    ('0,01', '0.01'),
+    ('1234.56', '1234.56'),
+    ('1,234.56', '1234.56'),
+    (' 42 ', '42'),
+])
+def test_parse_valor(texto, esperado):
+    assert importacao.parse_valor(texto) == Decimal(esperado)
+
+
+@pytest.mark.parametrize('texto', ['', 'abc', '1,2,3', 'NaN', 'Infinity'])
+def test_parse_valor_invalido(texto):
+    with pytest.raises(ValueError):
+        importacao.parse_valor(texto)
+
+
+@pytest.mark.parametrize('texto', ['2024-03-05', '05/03/2024', '05/03/24', '20240305'])
+def test_parse_data(texto):
+    assert importacao.parse_data(texto) == date(2024, 3, 5)
+
+
+@pytest.mark.parametrize('texto', ['2024-02-30', '32/01/2024', 'ontem'])
+def test_parse_data_invalida(texto):
+    with pytest.raises(ValueError):
+        importacao.parse_data(texto)
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('3/10', (3, 10)), (' 3 de 10 ', (3, 10)), ('48/48', (48, 48)),
+    ('À vista', (1, 1)), ('0/3', (1, 1)), ('5/3', (1, 1)), ('1/49', (1, 1)), (None, (1, 1)),
+])
+def test_parse_parcela(texto, esperado):
+    assert importacao.parse_parcela(texto) == esperado
+
+
+def test_normalizar():
+    assert importacao.normalizar({'data': '05/03/2024', 'valor': '-1.234,56', 'descricao': ' Mercado ',
+                                  'categoria': ' Alimentação '}) == {
+        'tipo': 'despesa', 'valor': Decimal('1234.56'), 'data': date(2024, 3, 5),
+        'descricao': 'Mercado', 'detalhe': 'Alimentação'
+    }
+    # Sem tipo, o sinal decide; tipo explícito ignora o sinal; detalhe padrão e truncado
+    assert importacao.normalizar({'data': '2024-03-05', 'valor': '10'})['tipo'] == 'ganho'
+    cartao = importacao.normalizar({'data': '2024-03-05', 'valor': '-10', 'tipo': 'Cartão'})
+    assert (cartao['tipo'], cartao['valor'], cartao['detalhe']) == ('cartao', Decimal('10'), 'À vista')
+    assert len(importacao.normalizar({'data': '2024-03-05', 'valor': '1', 'tipo': 'despesa',
+                                      'categoria': 'x' * 80})['detalhe']) == 50
+
+
+@pytest.mark.parametrize('registro, mensagem', [
+    ({'valor': '1'}, 'Coluna "data" vazia'),
+    ({'data': '2024-03-05'}, 'Coluna "valor" vazia'),
+    ({'data': '2024-03-05', 'valor': '0,00'}, 'Valor zero'),
+    ({'data': '2024-03-05', 'valor': '1', 'tipo': 'salario'}, "Tipo inválido: 'salario'"),
+    ({'erro': 'Crédito em fatura de cartão ignorado'}, 'Crédito em fatura de cartão ignorado'),
+])
+def test_normalizar_recusa(registro, mensagem):
+    with pytest.raises(ValueError, match=mensagem):
+        importacao.normalizar(registro)
+
+
+def test_ler_csv_com_ponto_e_virgula():
+    arquivo = io.StringIO('Data;Valor;Descricao;Categoria\n05/03/2024;-12,50;Padaria;Alimentação\n;;;\n'
+                          '06/03/2024;"1.000,00";Salário;\n')
+    assert list(importacao.ler_csv(arquivo)) == [
+        (2, {'data': '05/03/2024', 'valor': '-12,50', 'descricao': 'Padaria', 'categoria': 'Alimentação'}),
+        (4, {'data': '06/03/2024', 'valor': '1.000,00', 'descricao': 'Salário', 'categoria': ''}),
+    ]
+
+
+OFX = (
+    '<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>'
+    '<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240305120000[-3:BRT]<TRNAMT>-45.90<MEMO>Farmácia</STMTTRN>'
+    '<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240306<TRNAMT>3000.00<NAME>Salário</STMTTRN>'
+    '</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1>'
+    '<CREDITCARDMSGSRSV1><CCSTMTTRNRS><CCSTMTRS><BANKTRANLIST>'
+    '<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240307<TRNAMT>-99.00<MEMO>Loja</STMTTRN>'
+    '<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240310<TRNAMT>500.00<MEMO>Pagamento fatura</STMTTRN>'
+    '</BANKTRANLIST></CCSTMTRS></CCSTMTTRNRS></CREDITCARDMSGSRSV1></OFX>'
+)
+
+
+def test_ler_ofx():
+    registros = list(importacao.ler_ofx(io.StringIO(OFX)))
+    assert registros == [
+        (1, {'data': '20240305', 'valor': '-45.90', 'descricao': 'Farmácia'}),
+        (2, {'data': '20240306', 'valor': '3000.00', 'descricao': 'Salário'}),
+        (3, {'data': '20240307', 'valor': '-99.00', 'descricao': 'Loja', 'tipo': 'cartao'}),
+        (4, {'data': '20240310', 'valor': '500.00', 'descricao': 'Pagamento fatura',
+             'erro': 'Crédito em fatura de cartão ignorado'}),
+    ]
+
+
+def test_tokens_ofx_independem_do_tamanho_do_bloco():
+    inteiro = list(importacao._tokens_ofx(io.StringIO(OFX)))
+    for tamanho in (1, 7, 64):
+        assert list(importacao._tokens_ofx(io.StringIO(OFX), tamanho)) == inteiro
+
+
+def test_importacao_limita_erros_guardados(app, monkeypatch):
+    monkeypatch.setattr(ledger, 'IMPORTACAO_MAX_ERROS', 2)
+    registros = enumerate([{'data': 'x', 'valor': '1'}] * 5 + [{'data': '2024-03-05', 'valor': '1'}], start=2)
+    resultado = importar_movimentacoes(registros)
+    assert (resultado['importadas'], resultado['total_erros']) == (1, 5)
+    assert [numero for numero, _ in resultado['erros']] == [2, 3]
+
+
+def test_importacao_ida_e_volta(app, conferir):
+    csv = ('data,valor,tipo,categoria,descricao\n' +
+           ''.join(f'2024-0{1 + i % 3}-10,"-{i},25",despesa,Lazer,cinema {i}\n' for i in range(1, 6)) +
+           '2024-01-05,"3.000,00",ganho,Salário,salário\n'
+           '2024-01-06,"-1.200,00",cartao,2/10,notebook\n'
+           '2024-01-07,zero,despesa,Lazer,inválida\n')
+    progresso = []
+    resultado = importar_movimentacoes(importacao.ler_csv(io.StringIO(csv)), tamanho_lote=3,
+                                       progresso=lambda n, _: progresso.append(n))
+    assert (resultado['importadas'], resultado['total_erros']) == (7, 1)
+    # Lotes de 3: dois cheios com progresso, o resto gravado no fim
+    assert progresso == [3, 6]
+    totais, _ = consultar_totais()
+    assert totais['despesas'] == Decimal('16.25')
+    assert totais['ganhos'] == Decimal('3000.00')
+    assert totais['cartao'] == Decimal('1200.00')
+    conferir()
@@ -0,0 +1,35 @@
+from datetime import date
+import pytest
+from extensions import db
+from ledger import select_extrato
+from models import MODELOS
+
+
+def plano(stmt):
+    sql = str(stmt.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    return [linha[-1] for linha in db.session.execute(db.text('EXPLAIN QUERY PLAN ' + sql))]
+
+
+@pytest.mark.parametrize('tipos, filtros, indice', [
+    # Página do extrato: ordem (data, id) direto do índice, sem sort
+    (list(MODELOS), {}, 'ix_movimentacao_ativo_data_id'),
+    (list(MODELOS), {'data_inicio': date(2024, 1, 1), 'data_fim': date(2024, 1, 31)},
+     'ix_movimentacao_ativo_data_id'),
+    (['despesa', 'ganho'], {'data_inicio': date(2024, 1, 1), 'data_fim': date(2024, 12, 31)},
+     'ix_movimentacao_ativo_data_id'),
+    # Sem ANALYZE o SQLite escolhe entre os dois compostos (ativo, ..., data)
+    (['despesa'], {'categoria': 'Alimentação', 'data_inicio': date(2024, 1, 1), 'data_fim': date(2024, 12, 31)},
+     ('ix_movimentacao_ativo_detalhe_data', 'ix_movimentacao_ativo_tipo_data')),
+])
+def test_extrato_usa_indice(populado, tipos, filtros, indice):
+    indices = indice if isinstance(indice, tuple) else (indice,)
+    linhas = plano(select_extrato(tipos, limite=51, **filtros))
+    assert any(f'USING INDEX {nome} ' in linha for linha in linhas for nome in indices), linhas
+    assert not any(linha.startswith('SCAN movimentacao') for linha in linhas), linhas
+    assert not any('USE TEMP B-TREE FOR ORDER BY' in linha for linha in linhas), linhas
+
+
+def test_intervalo_de_datas_e_sargavel(populado):
+    # data >= inicio AND data < fim + 1 dia vira faixa no índice, não filtro por linha
+    linhas = plano(select_extrato(list(MODELOS), data_inicio=date(2024, 3, 1), data_fim=date(2024, 3, 31), limite=51))
+    assert any('data>? AND data<?' in linha for linha in linhas), linhas
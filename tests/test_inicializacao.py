@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+import time
+from app import create_app
+from instrumentacao import capturar_queries
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Em segundos, com folga para máquinas de CI lentas
+LIMITE_CREATE_APP = 1.0
+LIMITE_IMPORTACAO = 10.0
+
+
+def test_create_app_nao_toca_no_banco(tmp_path):
+    banco = tmp_path / 'inexistente.db'
+    inicio = time.perf_counter()
+    with capturar_queries() as queries:
+        create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(banco),
+            'TESTING': True,
+            'JINJA_CACHE_DIR': ''
+        })
+    duracao = time.perf_counter() - inicio
+    assert queries == []
+    # Nem sequer conectou: o SQLite teria criado o arquivo
+    assert not banco.exists()
+    assert duracao < LIMITE_CREATE_APP
+
+
+def test_importar_app_num_processo_novo(tmp_path):
+    # O que um worker do gunicorn faz no boot: `import app` cria a aplicação
+    banco = tmp_path / 'inexistente.db'
+    script = (
+        'import time; inicio = time.perf_counter()\n'
+        'from instrumentacao import capturar_queries\n'
+        'with capturar_queries() as queries:\n'
+        '    import app\n'
+        'print(len(queries), time.perf_counter() - inicio)\n'
+    )
+    ambiente = dict(os.environ, DATABASE_URL='sqlite:///' + str(banco), JINJA_CACHE_DIR='')
+    saida = subprocess.run([sys.executable, '-c', script], cwd=RAIZ, env=ambiente,
+                           capture_output=True, text=True, check=True).stdout.split()
+    queries, duracao = int(saida[0]), float(saida[1])
+    assert queries == 0
+    assert not banco.exists()
+    assert duracao < LIMITE_IMPORTACAO
@@ -0,0 +1,37 @@
+import os
+import shutil
+from flask_migrate import upgrade
+from app import create_app
+from extensions import db
+from ledger import reconstruir_resumo
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_upgrade_do_banco_original_sem_init_db(tmp_path):
+    # O banco versionado está na primeira revisão: `flask db upgrade` sozinho
+    # precisa deixar o app de pé, sem depender de `flask init-db`
+    banco = tmp_path / 'financas.db'
+    shutil.copy(os.path.join(RAIZ, 'instance', 'financas.db'), banco)
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(banco),
+        'TESTING': True,
+        'JINJA_CACHE_DIR': ''
+    })
+    with app.app_context():
+        upgrade(directory=os.path.join(RAIZ, 'migrations'))
+        assert db.session.execute(db.text('SELECT id FROM versao_dados ORDER BY id')).scalars().all() == [1, 2]
+        resumo = db.session.execute(db.text('SELECT * FROM resumo_mensal ORDER BY 1, 2, 3, 4')).all()
+        reconstruir_resumo()
+        assert db.session.execute(db.text('SELECT * FROM resumo_mensal ORDER BY 1, 2, 3, 4')).all() == resumo
+
+        cliente = app.test_client()
+        assert cliente.get('/').status_code == 200
+        assert cliente.get('/api/v1/totais').status_code == 200
+        resposta = cliente.post('/adicionar', data={
+            'tipo': 'despesa', 'valor': '10.00', 'data': '2025-01-02', 'categoria': 'Lazer'
+        })
+        assert resposta.status_code == 302
+        assert cliente.get('/api/v1/totais').get_json()['despesas'] == '10.00'
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,87 @@
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import select
+from extensions import db
+from models import Movimentacao, MovimentacaoArquivo
+from ledger import aplicar_operacoes, excluir_registro, arquivar_inativos, consultar_busca
+
+
+def primeiras(tipo, n, ativo=True):
+    return db.session.execute(
+        select(Movimentacao).where(Movimentacao.tipo == tipo, Movimentacao.ativo == ativo)
+        .order_by(Movimentacao.id).limit(n)
+    ).scalars().all()
+
+
+def estado(id):
+    mov = db.session.get(Movimentacao, id)
+    return mov and (mov.tipo, mov.valor, mov.data, mov.detalhe, mov.ativo)
+
+
+def test_lote_misto(populado, conferir):
+    despesas = [d.id for d in primeiras('despesa', 6)]
+    ganho = primeiras('ganho', 1)[0].id
+    donativo = primeiras('donativo', 1)[0].id
+    cartao = primeiras('cartao', 1)[0]
+    cartao = (cartao.id, cartao.detalhe)
+    # Uma excluída que já foi para o arquivo e outra ainda na tabela quente
+    arquivada, restaurada = despesas[5], despesas[4]
+    excluir_registro('despesa', arquivada)
+    db.session.commit()
+    assert arquivar_inativos() == 1
+    excluir_registro('despesa', restaurada)
+    db.session.commit()
+    intocadas = {id: estado(id) for id in (despesas[3], ganho)}
+
+    resultados = aplicar_operacoes([
+        {'tipo': 'despesa', 'id': despesas[0], 'operacao': 'excluir'},
+        {'tipo': 'despesa', 'id': despesas[1], 'operacao': 'recategorizar', 'detalhe': 'Viagens'},
+        {'tipo': 'despesa', 'id': despesas[2], 'operacao': 'recategorizar', 'detalhe': 'Viagens'},
+        {'tipo': 'cartao', 'id': cartao[0], 'operacao': 'editar', 'valor': '1.234,56', 'data': '2023-02-03'},
+        {'tipo': 'donativo', 'id': donativo, 'operacao': 'editar', 'valor': '99.90'},
+        {'tipo': 'despesa', 'id': restaurada, 'operacao': 'restaurar'},
+        {'tipo': 'despesa', 'id': arquivada, 'operacao': 'restaurar'},
+        # Recusadas
+        {'tipo': 'despesa', 'id': despesas[0], 'operacao': 'recategorizar', 'detalhe': 'Lazer'},
+        {'tipo': 'despesa', 'id': despesas[3], 'operacao': 'restaurar'},
+        {'tipo': 'despesa', 'id': despesas[3], 'operacao': 'editar', 'valor': '-5'},
+        {'tipo': 'ganho', 'id': ganho, 'operacao': 'editar'},
+        {'tipo': 'ganho', 'id': 10 ** 9, 'operacao': 'excluir'},
+        {'tipo': 'xpto', 'id': ganho, 'operacao': 'excluir'},
+        {'tipo': 'ganho', 'id': ganho, 'operacao': 'apagar'},
+        {'tipo': 'ganho', 'id': 'abc', 'operacao': 'excluir'},
+    ])
+    assert [r['status'] for r in resultados] == ['ok'] * 7 + ['erro'] * 8
+    mensagens = [r['mensagem'] for r in resultados[7:]]
+    assert mensagens[0] == 'Movimentação repetida no lote'
+    assert mensagens[1] == 'Registro já está ativo'
+    assert mensagens[2] == 'Valor deve ser positivo'
+    assert mensagens[3] == 'Informe o novo valor e/ou data'
+    assert mensagens[4] == 'Registro não encontrado'
+    assert mensagens[5:] == ['Tipo inválido: xpto', 'Operação inválida: apagar', "id inválido: 'abc'"]
+    conferir()
+
+    db.session.expire_all()
+    assert not db.session.get(Movimentacao, despesas[0]).ativo
+    assert {db.session.get(Movimentacao, id).detalhe for id in despesas[1:3]} == {'Viagens'}
+    editado = db.session.get(Movimentacao, cartao[0])
+    assert (editado.valor, editado.data, editado.detalhe) == (Decimal('1234.56'), date(2023, 2, 3), cartao[1])
+    assert db.session.get(Movimentacao, donativo).valor == Decimal('99.90')
+    assert db.session.get(Movimentacao, restaurada).ativo
+    assert db.session.get(Movimentacao, arquivada).ativo
+    assert db.session.get(MovimentacaoArquivo, ('despesa', arquivada)) is None
+    # Itens recusados não mexem nas linhas que citam
+    assert {id: estado(id) for id in (despesas[3], ganho)} == intocadas
+    # Recategorizadas aparecem na busca pela nova categoria
+    encontradas, _ = consultar_busca('viagens', limite=10)
+    assert {m.id for m in encontradas} >= set(despesas[1:3])
+
+
+def test_lote_pela_api_sem_aplicaveis_nao_muda_versao(cliente, conferir):
+    versao = cliente.get('/api/v1/totais').headers['ETag']
+    resposta = cliente.post('/api/v1/movimentacoes/lote', json={'operacoes': [
+        {'tipo': 'ganho', 'id': 10 ** 9, 'operacao': 'excluir'}
+    ]})
+    assert resposta.get_json()['message'] == '0 de 1 operações aplicadas'
+    assert cliente.get('/api/v1/totais', headers={'If-None-Match': versao}).status_code == 304
+    conferir()
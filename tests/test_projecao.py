@@ -0,0 +1,69 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import select
+from extensions import db
+from models import ZERO, Movimentacao
+from ledger import criar_movimentacao, consultar_projecao_cartao
+
+
+def indice(data):
+    return data.year * 12 + data.month - 1
+
+
+def projecao_ingenua(meses, inicio):
+    # Expande cada compra k/n em Python, parcela por parcela
+    primeiro = indice(inicio)
+    lancado, projetado, parcelas = defaultdict(lambda: ZERO), defaultdict(lambda: ZERO), defaultdict(int)
+    for compra in db.session.execute(select(Movimentacao).where(
+            Movimentacao.tipo == 'cartao', Movimentacao.ativo == True)).scalars():
+        for deslocamento in range(compra.parcela_total - compra.parcela_numero + 1):
+            mes = indice(compra.data) + deslocamento
+            if primeiro <= mes < primeiro + meses:
+                (projetado if deslocamento else lancado)[mes] += compra.valor
+                parcelas[mes] += 1
+    return [{'ano': mes // 12, 'mes': mes % 12 + 1, 'lancado': lancado[mes], 'projetado': projetado[mes],
+             'total': lancado[mes] + projetado[mes], 'parcelas': parcelas[mes]}
+            for mes in range(primeiro, primeiro + meses)]
+
+
+def cartao(valor, data, parcela):
+    criar_movimentacao('cartao', Decimal(valor), data, 'compra', parcela)
+
+
+def test_projecao_calculada_a_mao(app):
+    # Atravessa o início da janela: 2/6 de nov/2024 tem parcelas de dez a mar
+    cartao('600.00', date(2024, 11, 20), '2/6')
+    # k > 1 lançada dentro da janela: 4/5 em abr, 5/5 em mai
+    cartao('90.00', date(2025, 4, 2), '4/5')
+    cartao('10.00', date(2025, 1, 31), '1/12')
+    # Limite de parcelas: 1/48 de 47 meses antes tem a última parcela em mar;
+    # 1/49 não é parcela válida e vira à vista
+    cartao('48.00', date(2021, 4, 15), '1/48')
+    cartao('49.00', date(2021, 4, 15), '1/49')
+    criar_movimentacao('cartao', Decimal('1000.00'), date(2025, 3, 5), 'excluída', '1/3').ativo = False
+    db.session.commit()
+
+    inicio = date(2025, 3, 1)
+    projecao = consultar_projecao_cartao(4, inicio)
+    assert [(m['mes'], m['lancado'], m['projetado'], m['parcelas']) for m in projecao] == [
+        (3, ZERO, Decimal('658.00'), 3),
+        (4, Decimal('90.00'), Decimal('10.00'), 2),
+        (5, ZERO, Decimal('100.00'), 2),
+        (6, ZERO, Decimal('10.00'), 1),
+    ]
+    assert projecao == projecao_ingenua(4, inicio)
+    # Início no meio do mês conta o mês inteiro
+    assert consultar_projecao_cartao(4, date(2025, 3, 17)) == projecao
+
+
+def test_projecao_igual_a_expansao_ingenua(populado):
+    for inicio in (date(2023, 1, 1), date(2024, 7, 1), date(2025, 12, 1)):
+        for meses in (1, 12, 24):
+            assert consultar_projecao_cartao(meses, inicio) == projecao_ingenua(meses, inicio)
+
+
+def test_projecao_sem_compras(app):
+    projecao = consultar_projecao_cartao(3, date(2025, 11, 1))
+    assert [(m['ano'], m['mes'], m['total'], m['parcelas']) for m in projecao] == [
+        (2025, 11, ZERO, 0), (2025, 12, ZERO, 0), (2026, 1, ZERO, 0)]
@@ -0,0 +1,117 @@
+import re
+from html import unescape
+import pytest
+from sqlalchemy import insert, update
+from extensions import db, registro_categorias
+from models import CategoriaDespesa, VersaoDados
+from ledger import VERSAO_CATEGORIAS
+from instrumentacao import capturar_queries
+
+# Orçamento de queries por rota, já com os caches aquecidos. Cada rota lê uma
+# quantidade fixa de statements, não importa quantas movimentações mostre:
+# passar disso é N+1 ou cache que deixou de funcionar.
+ROTAS = [
+    ('/', 2),
+    ('/extrato', 1),
+    ('/extrato?categoria=Lazer', 1),
+    ('/busca?q=mercado', 2),
+    ('/relatorio_anual?ano=2024', 1),
+    ('/relatorio_anual?ano=2023&ano=2024', 1),
+    ('/relatorio_cartao', 1),
+    ('/relatorio_categorias', 2),
+    ('/recorrencias', 1),
+    ('/api/v1/totais', 2),
+    ('/api/v1/movimentacoes', 2),
+    ('/api/v1/movimentacoes?categoria=Lazer', 2),
+    ('/api/v1/busca?q=mercado', 3),
+    ('/api/v1/relatorios/mensal?ano=2024&mes=3', 2),
+    ('/api/v1/relatorios/anual?ano=2024', 2),
+    ('/api/v1/relatorios/cartao', 2),
+]
+
+
+def requisitar(cliente, url, **kwargs):
+    with capturar_queries() as queries:
+        resposta = cliente.open(url, **kwargs)
+    assert resposta.status_code == 200
+    # O cabeçalho conta as mesmas queries que o listener
+    assert int(resposta.headers['X-Query-Count']) == len(queries)
+    return queries
+
+
+@pytest.fixture
+def aquecido(cliente):
+    # Recorrências do dia, categorias e totais carregados pela primeira vez
+    cliente.get('/')
+    return cliente
+
+
+@pytest.mark.parametrize('url, limite', ROTAS)
+def test_queries_por_rota(aquecido, url, limite):
+    queries = requisitar(aquecido, url)
+    assert len(queries) <= limite, '\n'.join(queries)
+
+
+def test_queries_relatorio_mensal(aquecido):
+    queries = requisitar(aquecido, '/relatorio_mensal', method='POST', data={'mes': '3', 'ano': '2024'})
+    assert len(queries) <= 1
+
+
+def test_queries_pagina_seguinte_do_extrato(aquecido):
+    # O link "Próxima página" leva o cursor data:id da última linha
+    html = aquecido.get('/extrato').get_data(as_text=True)
+    proxima, = re.findall(r'href="(/extrato\?cursor=[^"]+)"', html)
+    queries = requisitar(aquecido, unescape(proxima))
+    assert len(queries) <= 1
+    assert 'movimentacao.data <' in queries[0]
+
+
+def test_queries_pagina_seguinte_da_api(aquecido):
+    cursor = aquecido.get('/api/v1/movimentacoes').get_json()['proximo_cursor']
+    queries = requisitar(aquecido, f'/api/v1/movimentacoes?cursor={cursor}')
+    assert len(queries) <= 2
+
+
+def test_formulario_sem_queries_com_registro_aquecido(aquecido):
+    # Dentro do intervalo de verificação o registro nem consulta a versão
+    queries = requisitar(aquecido, '/adicionar')
+    assert queries == []
+
+
+def test_categoria_nova_do_proprio_worker(aquecido):
+    resposta = aquecido.post('/adicionar', data={
+        'tipo': 'despesa', 'valor': '10,00', 'data': '2025-03-01', 'descricao': 'aula',
+        'categoria': 'Outros', 'nova_categoria': 'Educação'})
+    assert resposta.status_code == 302
+    # O registro recebe a categoria no commit, sem recarregar
+    queries = requisitar(aquecido, '/adicionar')
+    assert queries == []
+    assert 'Educação' in aquecido.get('/adicionar').get_data(as_text=True)
+
+
+def test_categoria_nova_de_outro_worker_invalida_pela_versao(populado, aquecido):
+    # Outro worker grava a categoria e sobe a linha de versão das categorias
+    db.session.execute(insert(CategoriaDespesa).values(nome='Jardinagem', ativo=True))
+    db.session.execute(update(VersaoDados).where(VersaoDados.id == VERSAO_CATEGORIAS)
+                       .values(versao=VersaoDados.versao + 1))
+    db.session.commit()
+    assert 'Jardinagem' not in aquecido.get('/adicionar').get_data(as_text=True)
+
+    # Vencido o intervalo: uma query para a versão e outra para recarregar
+    registro_categorias.intervalo = 0
+    with capturar_queries() as queries:
+        html = aquecido.get('/adicionar').get_data(as_text=True)
+    assert 'Jardinagem' in html
+    assert len(queries) == 2
+
+    # Versão igual: só a verificação, sem recarga
+    with capturar_queries() as queries:
+        aquecido.get('/adicionar')
+    assert len(queries) == 1
+
+
+def test_limite_de_queries_falha_nos_testes(populado, aquecido):
+    populado.config['INSTRUMENTACAO_LIMITE_QUERIES'] = 2
+    assert aquecido.get('/extrato').status_code == 200
+    with pytest.raises(AssertionError, match='possível N\\+1'):
+        aquecido.get('/api/v1/busca?q=mercado')
@@ -0,0 +1,76 @@
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import func, select, update
+from extensions import db
+from models import Movimentacao, Recorrencia
+import recorrencias
+from ledger import criar_recorrencia, materializar_recorrencias
+
+
+def regra(frequencia, dia, inicio, intervalo=1, fim=None, gerada_ate=None):
+    return SimpleNamespace(frequencia=frequencia, dia=dia, intervalo=intervalo, data_inicio=inicio,
+                           data_fim=fim, gerada_ate=gerada_ate)
+
+
+@pytest.mark.parametrize('dia, esperado', [
+    (29, [date(2024, 1, 29), date(2024, 2, 29), date(2024, 3, 29), date(2024, 4, 29)]),
+    (30, [date(2024, 1, 30), date(2024, 2, 29), date(2024, 3, 30), date(2024, 4, 30)]),
+    (31, [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)]),
+])
+def test_mensal_no_fim_do_mes(dia, esperado):
+    assert recorrencias.ocorrencias(regra('mensal', dia, date(2024, 1, 1)), date(2024, 4, 30)) == esperado
+
+
+def test_mensal_em_ano_nao_bissexto_e_intervalo():
+    assert recorrencias.ocorrencias(regra('mensal', 31, date(2023, 1, 31), intervalo=1), date(2023, 3, 1)) == [
+        date(2023, 1, 31), date(2023, 2, 28)]
+    # Trimestral começando depois do dia: o primeiro mês fica de fora
+    assert recorrencias.ocorrencias(regra('mensal', 5, date(2024, 1, 10), intervalo=3), date(2024, 12, 31)) == [
+        date(2024, 4, 5), date(2024, 7, 5), date(2024, 10, 5)]
+
+
+def test_semanal_com_intervalo():
+    # Quinzenal às sextas a partir de uma quarta-feira
+    assert recorrencias.ocorrencias(regra('semanal', 4, date(2024, 3, 6), intervalo=2), date(2024, 4, 30)) == [
+        date(2024, 3, 8), date(2024, 3, 22), date(2024, 4, 5), date(2024, 4, 19)]
+
+
+def test_data_fim_e_retomada():
+    mensal = regra('mensal', 10, date(2024, 1, 1), fim=date(2024, 3, 10))
+    assert recorrencias.ocorrencias(mensal, date(2024, 12, 31)) == [
+        date(2024, 1, 10), date(2024, 2, 10), date(2024, 3, 10)]
+    # Retomada no meio da série não desloca o passo, que conta de data_inicio
+    quinzenal = regra('semanal', 4, date(2024, 3, 6), intervalo=2, gerada_ate=date(2024, 3, 25))
+    assert recorrencias.ocorrencias(quinzenal, date(2024, 4, 30)) == [date(2024, 4, 5), date(2024, 4, 19)]
+    assert recorrencias.ocorrencias(regra('mensal', 10, date(2024, 5, 1)), date(2024, 4, 30)) == []
+
+
+def contar():
+    return db.session.execute(select(func.count()).select_from(Movimentacao)).scalar()
+
+
+def test_reexecucao_nao_duplica(app, conferir):
+    criar_recorrencia('despesa', Decimal('1500.00'), 'Moradia', 'aluguel', 'mensal', 31, 1, date(2024, 1, 1))
+    criar_recorrencia('ganho', Decimal('100.00'), 'Freela', None, 'semanal', 0, 2, date(2024, 1, 1),
+                      date(2024, 2, 29))
+    db.session.commit()
+
+    assert materializar_recorrencias(date(2024, 4, 30), tamanho_lote=3) == 4 + 5
+    assert contar() == 9
+    assert materializar_recorrencias(date(2024, 4, 30)) == 0
+
+    # Marca d'água perdida (ou outro worker que não viu o commit): as chaves
+    # de ocorrência recusam tudo o que já foi gerado
+    db.session.execute(update(Recorrencia).values(gerada_ate=None))
+    db.session.commit()
+    assert materializar_recorrencias(date(2024, 4, 30), tamanho_lote=2) == 0
+    assert contar() == 9
+
+    # Avançando a data, só o mês novo do aluguel; a regra semanal já terminou
+    assert materializar_recorrencias(date(2024, 5, 31)) == 1
+    assert db.session.execute(select(Movimentacao.data).where(Movimentacao.tipo == 'despesa')
+                              .order_by(Movimentacao.data)).scalars().all() == [
+        date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30), date(2024, 5, 31)]
+    conferir()
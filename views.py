@@ -0,0 +1,429 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
+from extensions import db
+from models import CENTAVO, Recorrencia, MODELOS
+from ledger import (FILTRO_TIPOS, EXTRATO_LIMITE_PADRAO, EXTRATO_LIMITE_MAXIMO, RELATORIO_ANUAL_MAX_ANOS,
+                    decodificar_cursor, totais_dashboard, ultimas_movimentacoes, select_extrato,
+                    consultar_extrato, criar_movimentacao, excluir_registro, importar_movimentacoes,
+                    consultar_relatorio_mensal, consultar_relatorio_anual, consultar_busca,
+                    PROJECAO_MESES_PADRAO, PROJECAO_MESES_MAXIMO, consultar_projecao_cartao,
+                    criar_recorrencia, materializar_recorrencias, categorias_despesa,
+                    ANALISE_MESES_PADRAO, ANALISE_MESES_MAXIMO, consultar_analise_categorias, definir_orcamentos)
+from busca import BUSCA_LIMITE_PADRAO, BUSCA_LIMITE_MAXIMO
+import importacao
+from recorrencias import TIPOS as TIPOS_RECORRENCIA, DIAS_SEMANA
+
+bp = Blueprint('main', __name__)
+
+@bp.app_template_filter('moeda')
+def formatar_moeda(valor):
+    # Única camada de formatação de valores: 1234.5 -> '1.234,50'
+    valor = Decimal(valor or 0).quantize(CENTAVO, ROUND_HALF_UP)
+    return f'{valor:,.2f}'.replace(',', '_').replace('.', ',').replace('_', '.')
+
+def get_month_name(month_num):
+    months = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho', 
+              'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro']
+    return months[month_num - 1]
+
+@bp.route('/')
+def dashboard():
+    try:
+        totals = totais_dashboard()
+        transactions = ultimas_movimentacoes(5)
+
+        return render_template('dashboard.html',
+                            total_ganhos=totals['ganhos'],
+                            total_despesas=totals['despesas'],
+                            total_cartao=totals['cartao'],
+                            total_donativos=totals['donativos'],
+                            saldo=totals['saldo'],
+                            movimentacoes=transactions,
+                            now=datetime.now())
+    
+    except Exception as e:
+        current_app.logger.error(f'Erro no dashboard: {str(e)}', exc_info=True)
+        flash('Ocorreu um erro ao carregar os dados. Tente novamente.', 'danger')
+        return render_template('dashboard.html',
+                            total_ganhos=0,
+                            total_despesas=0,
+                            total_cartao=0,
+                            total_donativos=0,
+                            saldo=0,
+                            movimentacoes=[],
+                            now=datetime.now())
+
+@bp.route('/adicionar', methods=['GET', 'POST'])
+def adicionar_movimentacao():
+    if request.method == 'POST':
+        try:
+            tipo = request.form['tipo']
+            valor = importacao.parse_valor(request.form['valor'])
+            data = datetime.strptime(request.form['data'], '%Y-%m-%d').date()
+            descricao = request.form.get('descricao', '')
+            
+            if tipo == 'ganho':
+                detalhe = request.form['origem']
+            elif tipo == 'despesa':
+                categoria = request.form['categoria']
+                
+                # A categoria nova é criada junto com a movimentação, no mesmo commit
+                if categoria == 'Outros' and request.form.get('nova_categoria', '').strip():
+                    categoria = request.form['nova_categoria'].strip()
+                
+                detalhe = categoria
+            elif tipo == 'cartao':
+                detalhe = request.form['parcela']
+            elif tipo == 'donativo':
+                detalhe = request.form['instituicao']
+            else:
+                raise KeyError('tipo')
+            
+            criar_movimentacao(tipo, valor, data, descricao, detalhe)
+            db.session.commit()
+            flash('Movimentação registrada com sucesso!', 'success')
+            return redirect(url_for('main.dashboard'))
+        
+        except ValueError:
+            flash('Valor inválido! Use números para o valor.', 'danger')
+        except KeyError as e:
+            flash(f'Campo obrigatório faltando: {str(e)}', 'danger')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao salvar: {str(e)}', 'danger')
+    
+    return render_template('adicionar_movimentacao.html', categorias=categorias_despesa(), now=datetime.now())
+
+def _data_arg(nome):
+    valor = request.args.get(nome)
+    return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
+
+def _valor_arg(nome):
+    valor = request.args.get(nome)
+    return importacao.parse_valor(valor) if valor else None
+
+def filtros_extrato():
+    tipo = request.args.get('tipo', 'todos')
+    if tipo not in FILTRO_TIPOS:
+        raise ValueError(f'Tipo inválido: {tipo}')
+    cursor = request.args.get('cursor')
+    limite = request.args.get('limite', EXTRATO_LIMITE_PADRAO, type=int)
+    return {
+        'tipos': FILTRO_TIPOS[tipo],
+        'data_inicio': _data_arg('data_inicio'),
+        'data_fim': _data_arg('data_fim'),
+        'categoria': request.args.get('categoria') or None,
+        'valor_min': _valor_arg('valor_min'),
+        'valor_max': _valor_arg('valor_max'),
+        'cursor': decodificar_cursor(cursor) if cursor else None,
+        'limite': max(1, min(limite, EXTRATO_LIMITE_MAXIMO))
+    }
+
+def filtros_busca():
+    tipo = request.args.get('tipo', 'todos')
+    if tipo not in FILTRO_TIPOS:
+        raise ValueError(f'Tipo inválido: {tipo}')
+    limite = request.args.get('limite', BUSCA_LIMITE_PADRAO, type=int)
+    return {
+        'consulta': request.args.get('q', ''),
+        'tipos': FILTRO_TIPOS[tipo],
+        'data_inicio': _data_arg('data_inicio'),
+        'data_fim': _data_arg('data_fim'),
+        'pagina': max(1, request.args.get('pagina', 1, type=int)),
+        'limite': max(1, min(limite, BUSCA_LIMITE_MAXIMO))
+    }
+
+@bp.route('/importar', methods=['GET', 'POST'])
+def importar():
+    relatorio = None
+    if request.method == 'POST':
+        try:
+            arquivo = request.files['arquivo']
+            formato = importacao.formato_arquivo(arquivo.filename, request.form.get('formato'))
+            texto = io.TextIOWrapper(arquivo.stream, encoding=request.form.get('encoding') or 'utf-8-sig',
+                                     errors='replace', newline='')
+            relatorio = importar_movimentacoes(importacao.ler(texto, formato))
+            flash(f"{relatorio['importadas']} movimentações importadas.", 'success')
+        except KeyError as e:
+            flash(f'Campo obrigatório faltando: {str(e)}', 'danger')
+        except Exception as e:
+            flash(f'Erro ao importar: {str(e)}', 'danger')
+    
+    return render_template('importar.html', relatorio=relatorio, now=datetime.now())
+
+@bp.route('/extrato')
+def extrato():
+    try:
+        movimentacoes, proximo_cursor = consultar_extrato(**filtros_extrato())
+        return render_template('extrato.html',
+                            movimentacoes=movimentacoes,
+                            proximo_cursor=proximo_cursor,
+                            categorias=categorias_despesa(),
+                            now=datetime.now())
+    except Exception as e:
+        flash(f'Erro ao carregar extrato: {str(e)}', 'danger')
+        return render_template('extrato.html', movimentacoes=[], proximo_cursor=None, now=datetime.now())
+
+@bp.route('/busca')
+def buscar():
+    try:
+        filtros = filtros_busca()
+        movimentacoes, tem_proxima = consultar_busca(**filtros)
+    except Exception as e:
+        flash(f'Erro na busca: {str(e)}', 'danger')
+        filtros, movimentacoes, tem_proxima = {'pagina': 1}, [], False
+    return render_template('busca.html',
+                        movimentacoes=movimentacoes,
+                        pagina=filtros['pagina'],
+                        tem_proxima=tem_proxima,
+                        now=datetime.now())
+
+EXPORTACAO_LOTE = 1000
+
+COLUNAS_EXPORTACAO = ['tipo', 'id', 'data', 'valor', 'descricao', 'detalhe']
+
+def _linhas_csv(lotes):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUNAS_EXPORTACAO)
+    yield buffer.getvalue()
+    for lote in lotes:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows((m.tipo, m.id, m.data.isoformat(), m.valor, m.descricao or '', m.detalhe) for m in lote)
+        yield buffer.getvalue()
+
+def _linhas_ndjson(lotes):
+    for lote in lotes:
+        yield ''.join(json.dumps({
+            'tipo': m.tipo,
+            'id': m.id,
+            'data': m.data.isoformat(),
+            'valor': str(m.valor),
+            'descricao': m.descricao,
+            'detalhe': m.detalhe
+        }, ensure_ascii=False) + '\n' for m in lote)
+
+FORMATOS_EXPORTACAO = {
+    'csv': (_linhas_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (_linhas_ndjson, 'application/x-ndjson; charset=utf-8')
+}
+
+@bp.route('/extrato/export')
+def exportar_extrato():
+    formato = request.args.get('format', 'csv')
+    if formato not in FORMATOS_EXPORTACAO:
+        return jsonify({'success': False, 'message': f'Formato inválido: {formato}'}), 400
+    try:
+        filtros = filtros_extrato()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    filtros.pop('limite')
+    stmt = select_extrato(**filtros)
+    gerar, mimetype = FORMATOS_EXPORTACAO[formato]
+
+    def lotes():
+        # yield_per ativa stream_results: cursor do lado do servidor no psycopg2
+        # e nunca mais que um lote de linhas em memória
+        if stmt is None:
+            return
+        resultado = db.session.execute(stmt.execution_options(yield_per=EXPORTACAO_LOTE))
+        yield from resultado.partitions()
+
+    return Response(stream_with_context(gerar(lotes())),
+                    mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename=extrato.{formato}'})
+
+@bp.route('/relatorios')
+def relatorios():
+    return render_template('relatorios.html', now=datetime.now())
+
+@bp.route('/relatorio_mensal', methods=['GET', 'POST'])
+def relatorio_mensal():
+    if request.method == 'POST':
+        try:
+            mes = int(request.form['mes'])
+            ano = int(request.form['ano'])
+            
+            totais = consultar_relatorio_mensal(ano, mes)
+            
+            return render_template('relatorio_mensal.html',
+                                mes=mes,
+                                ano=ano,
+                                ganhos=totais['ganho'],
+                                despesas=totais['despesa'],
+                                cartao=totais['cartao'],
+                                donativos=totais['donativo'],
+                                saldo=totais['saldo'],
+                                get_month_name=get_month_name,
+                                now=datetime.now())
+        
+        except Exception as e:
+            flash(f'Erro ao gerar relatório: {str(e)}', 'danger')
+            return redirect(url_for('main.relatorio_mensal'))
+    
+    return render_template('selecionar_mes_ano.html', tipo='mensal', now=datetime.now())
+
+@bp.route('/relatorio_anual', methods=['GET', 'POST'])
+def relatorio_anual():
+    parametros = request.form if request.method == 'POST' else request.args
+    if parametros.getlist('ano'):
+        try:
+            anos = sorted({int(ano) for ano in parametros.getlist('ano')})
+            if len(anos) > RELATORIO_ANUAL_MAX_ANOS:
+                raise ValueError(f'Selecione no máximo {RELATORIO_ANUAL_MAX_ANOS} anos')
+            relatorio = consultar_relatorio_anual(anos)
+            
+            if parametros.get('formato') == 'json':
+                return jsonify({'anos': relatorio})
+            
+            return render_template('relatorio_anual.html',
+                                relatorio=relatorio,
+                                get_month_name=get_month_name,
+                                now=datetime.now())
+        
+        except Exception as e:
+            if parametros.get('formato') == 'json':
+                return jsonify({'success': False, 'message': str(e)}), 400
+            flash(f'Erro ao gerar relatório: {str(e)}', 'danger')
+            return redirect(url_for('main.relatorio_anual'))
+    
+    return render_template('selecionar_ano.html', tipo='anual', now=datetime.now())
+
+def meses_projecao(parametros):
+    meses = parametros.get('meses', PROJECAO_MESES_PADRAO, type=int)
+    return max(1, min(meses, PROJECAO_MESES_MAXIMO))
+
+@bp.route('/relatorio_cartao')
+def relatorio_cartao():
+    meses = meses_projecao(request.args)
+    projecao = consultar_projecao_cartao(meses)
+    if request.args.get('formato') == 'json':
+        return jsonify({'meses': projecao})
+    return render_template('relatorio_cartao.html',
+                        projecao=projecao,
+                        meses=meses,
+                        total=sum(m['total'] for m in projecao),
+                        get_month_name=get_month_name,
+                        now=datetime.now())
+
+@bp.route('/relatorio_categorias')
+def relatorio_categorias():
+    meses = max(1, min(request.args.get('meses', ANALISE_MESES_PADRAO, type=int), ANALISE_MESES_MAXIMO))
+    analise = consultar_analise_categorias(meses)
+    if request.args.get('formato') == 'json':
+        return jsonify(analise)
+    return render_template('relatorio_categorias.html',
+                        analise=analise,
+                        meses=meses,
+                        categorias=categorias_despesa(),
+                        orcamentos={c['nome']: c['orcamento'] for c in analise['categorias']
+                                    if c['orcamento'] is not None},
+                        get_month_name=get_month_name,
+                        now=datetime.now())
+
+@bp.route('/relatorio_categorias/orcamentos', methods=['POST'])
+def salvar_orcamentos():
+    try:
+        # Campo vazio remove o orçamento da categoria
+        orcamentos = {
+            nome: importacao.parse_valor(valor) if valor.strip() else None
+            for nome, valor in zip(request.form.getlist('categoria'), request.form.getlist('orcamento'))
+        }
+        definir_orcamentos(orcamentos)
+        db.session.commit()
+        flash('Orçamentos atualizados!', 'success')
+    except ValueError:
+        flash('Valor de orçamento inválido!', 'danger')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao salvar: {str(e)}', 'danger')
+    return redirect(url_for('main.relatorio_categorias', meses=request.form.get('meses', ANALISE_MESES_PADRAO)))
+
+# Última data em que este worker materializou recorrências
+_recorrencias_em = {'data': None}
+
+@bp.before_app_request
+def materializar_recorrencias_do_dia():
+    # Na primeira requisição do dia; a idempotência da materialização torna
+    # inofensivo que vários workers façam o mesmo
+    hoje = date.today()
+    if not current_app.config.get('RECORRENCIAS_AUTOMATICAS') or _recorrencias_em['data'] == hoje:
+        return
+    _recorrencias_em['data'] = hoje
+    try:
+        materializar_recorrencias(hoje)
+    except Exception as e:
+        db.session.rollback()
+        _recorrencias_em['data'] = None
+        current_app.logger.error(f'Erro ao materializar recorrências: {str(e)}', exc_info=True)
+
+@bp.route('/recorrencias', methods=['GET', 'POST'])
+def recorrencias():
+    if request.method == 'POST':
+        try:
+            data_fim = request.form.get('data_fim')
+            criar_recorrencia(
+                request.form['tipo'],
+                importacao.parse_valor(request.form['valor']),
+                request.form['detalhe'].strip(),
+                request.form.get('descricao', ''),
+                request.form['frequencia'],
+                int(request.form['dia']),
+                int(request.form.get('intervalo') or 1),
+                datetime.strptime(request.form['data_inicio'], '%Y-%m-%d').date(),
+                datetime.strptime(data_fim, '%Y-%m-%d').date() if data_fim else None
+            )
+            db.session.commit()
+            geradas = materializar_recorrencias()
+            flash(f'Recorrência criada; {geradas} lançamentos gerados até hoje.', 'success')
+            return redirect(url_for('main.recorrencias'))
+        except KeyError as e:
+            flash(f'Campo obrigatório faltando: {str(e)}', 'danger')
+        except ValueError as e:
+            db.session.rollback()
+            flash(str(e), 'danger')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao salvar: {str(e)}', 'danger')
+
+    regras = Recorrencia.query.filter_by(ativo=True).order_by(Recorrencia.tipo, Recorrencia.dia).all()
+    return render_template('recorrencias.html',
+                        regras=regras,
+                        categorias=categorias_despesa(),
+                        tipos=TIPOS_RECORRENCIA,
+                        dias_semana=DIAS_SEMANA,
+                        now=datetime.now())
+
+@bp.route('/recorrencias/<int:id>/encerrar', methods=['POST'])
+def encerrar_recorrencia(id):
+    # Lançamentos já gerados ficam; só para de gerar novos
+    regra = db.session.get(Recorrencia, id)
+    if regra:
+        regra.ativo = False
+        db.session.commit()
+        flash('Recorrência encerrada.', 'success')
+    return redirect(url_for('main.recorrencias'))
+
+@bp.route('/excluir/<tipo>/<int:id>', methods=['POST'])
+def excluir_movimentacao(tipo, id):
+    try:
+        model = MODELOS.get(tipo)
+        
+        if not model:
+            return jsonify({'success': False, 'message': 'Tipo inválido'}), 400
+        
+        registro = excluir_registro(tipo, id)
+        if registro:
+            db.session.commit()
+            return jsonify({'success': True, 'message': 'Registro excluído com sucesso'})
+        return jsonify({'success': False, 'message': 'Registro não encontrado'}), 404
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 500
+